@@ -0,0 +1 @@
+"""Benchmarks for the template media player."""
@@ -0,0 +1,59 @@
+"""In-process Home Assistant stand-in used by the benchmarks.
+
+Run the benchmarks from the repository root with Home Assistant installed,
+for example ``python -m benchmarks.select_source``.
+"""
+from datetime import timedelta
+import logging
+import tempfile
+
+from homeassistant import bootstrap, config_entries
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import EntityPlatform
+
+from custom_components.media_player_template import media_player
+
+_LOGGER = logging.getLogger(__name__)
+
+PLATFORM = "media_player_template"
+
+
+async def async_start_hass():
+    """Start a bare Home Assistant instance with a throwaway config dir."""
+    config_dir = tempfile.mkdtemp(prefix="media_player_template_bench_")
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # Home Assistant before 2024.2 takes no config dir argument.
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    # Registries, entity sources and restore state, as during a normal boot.
+    load_base = getattr(bootstrap, "async_load_base_functionality", None)
+    await (load_base or bootstrap.load_registries)(hass)
+    await hass.async_start()
+    return hass
+
+
+async def async_setup_players(hass, players):
+    """Validate ``players`` and add them through a media_player entity platform.
+
+    ``players`` maps object ids to raw media player configs, as they would
+    appear under ``media_players:`` in YAML. Returns the created entities.
+    """
+    config = media_player.PLATFORM_SCHEMA(
+        {"platform": PLATFORM, media_player.CONF_MEDIAPLAYER: players}
+    )
+    platform = EntityPlatform(
+        hass=hass,
+        logger=_LOGGER,
+        domain="media_player",
+        platform_name=PLATFORM,
+        platform=None,
+        scan_interval=timedelta(seconds=30),
+        entity_namespace=None,
+    )
+    entities = await media_player._async_create_entities(hass, config)
+    await platform.async_add_entities(entities)
+    await hass.async_block_till_done()
+    return entities
@@ -0,0 +1,220 @@
+"""Fleet-scale benchmark for the template media player.
+
+Sets up N players against an in-process Home Assistant, drives synthetic state
+changes on their source entities and reports setup time, state writes per
+second, template results per upstream update, event loop latency and memory
+per entity.
+
+    python -m benchmarks.fleet --players 10,100,1000,5000 --rounds 20
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import callback
+
+from .common import async_setup_players, async_start_hass
+
+# Source entity attributes driven by the benchmark, one input_text per field.
+FIELDS = ("state", "source", "title", "artist", "album", "volume", "position")
+
+
+def player_config(index):
+    """Return a raw media player config reading from its own source entities."""
+
+    def source(field):
+        return "{{ states('input_text.p%d_%s') }}" % (index, field)
+
+    config = {
+        "value_template": source("state"),
+        "current_source_template": source("source"),
+        "title_template": source("title"),
+        "artist_template": source("artist"),
+        "album_template": source("album"),
+        "current_volume_template": source("volume"),
+        "current_position_template": source("position"),
+        "media_duration_template": "{{ 300 }}",
+        "inputs": {"tv": [{"event": "bench_tv"}], "radio": [{"event": "bench_radio"}]},
+        "set_volume": [{"event": "bench_volume"}],
+        # Every player shares the same upstream receiver and artwork.
+        "availability_template": "{{ not is_state('input_text.receiver', 'off') }}",
+        "media_image_url_template": "{{ states('input_text.receiver_art') }}",
+    }
+    return config
+
+
+def _set_sources(hass, index, round_):
+    """Simulate a track change on player ``index``."""
+    prefix = f"input_text.p{index}_"
+    hass.states.async_set(prefix + "state", "playing")
+    hass.states.async_set(prefix + "source", "tv" if round_ % 2 else "radio")
+    hass.states.async_set(prefix + "title", f"Track {round_}")
+    hass.states.async_set(prefix + "artist", f"Artist {round_ % 7}")
+    hass.states.async_set(prefix + "album", f"Album {round_ % 3}")
+    hass.states.async_set(prefix + "volume", str((round_ % 10) / 10))
+    hass.states.async_set(prefix + "position", str(round_ * 30))
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def _async_probe_loop(lags, interval, stop):
+    """Record how late the event loop runs a timer scheduled every ``interval``."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+async def _async_measure_memory(hass, offset, count):
+    """Return traced bytes per entity for ``count`` additional players.
+
+    Tracing slows allocation heavily, so memory is sampled on a separate batch
+    of players instead of during the timed setup.
+    """
+    for index in range(offset, offset + count):
+        _set_sources(hass, index, 0)
+    await hass.async_block_till_done()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await async_setup_players(
+        hass,
+        {f"p{index}": player_config(index) for index in range(offset, offset + count)},
+    )
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")) / count
+
+
+async def async_run(players, rounds, probe_interval, memory_sample):
+    """Benchmark a fleet of ``players`` and return the measurements."""
+    hass = await async_start_hass()
+    hass.states.async_set("input_text.receiver", "on")
+    hass.states.async_set("input_text.receiver_art", "/art/0.png")
+    for index in range(players):
+        _set_sources(hass, index, 0)
+    await hass.async_block_till_done()
+
+    start = time.perf_counter()
+    entities = await async_setup_players(
+        hass, {f"p{index}": player_config(index) for index in range(players)}
+    )
+    setup_time = time.perf_counter() - start
+
+    writes = 0
+
+    @callback
+    def _async_count_write(event):
+        nonlocal writes
+        if event.data["entity_id"].startswith("media_player."):
+            writes += 1
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_count_write)
+    renders_before = sum(sum(entity.render_counts.values()) for entity in entities)
+
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_async_probe_loop(lags, probe_interval, stop))
+    start = time.perf_counter()
+    for round_ in range(1, rounds + 1):
+        hass.states.async_set("input_text.receiver_art", f"/art/{round_}.png")
+        for index in range(players):
+            _set_sources(hass, index, round_)
+            # Let the loop interleave the probe, as separate upstream events would.
+            await asyncio.sleep(0)
+        await hass.async_block_till_done()
+    # Give a coalescing window the chance to flush.
+    await asyncio.sleep(0.5)
+    await hass.async_block_till_done()
+    drive_time = time.perf_counter() - start
+    stop.set()
+    await probe
+    unsub()
+
+    renders = sum(sum(entity.render_counts.values()) for entity in entities)
+    upstream_updates = rounds * (players * len(FIELDS) + 1)
+    memory = await _async_measure_memory(hass, players, memory_sample)
+    await hass.async_stop()
+    return {
+        "players": players,
+        "setup_s": setup_time,
+        "writes_per_s": writes / drive_time,
+        "writes": writes,
+        "renders_per_update": (renders - renders_before) / upstream_updates,
+        "lag_p50_ms": _percentile(lags, 50) * 1000,
+        "lag_p99_ms": _percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+        "bytes_per_entity": memory,
+    }
+
+
+COLUMNS = (
+    ("players", "{:>8}"),
+    ("setup_s", "{:>9.3f}"),
+    ("writes", "{:>8}"),
+    ("writes_per_s", "{:>13.0f}"),
+    ("renders_per_update", "{:>19.2f}"),
+    ("lag_p50_ms", "{:>11.2f}"),
+    ("lag_p99_ms", "{:>11.2f}"),
+    ("lag_max_ms", "{:>11.2f}"),
+    ("bytes_per_entity", "{:>17.0f}"),
+)
+
+
+def _print_header():
+    print(" ".join(f"{name:>{len(fmt.format(0)) }}" for name, fmt in COLUMNS))
+
+
+def _print_row(result):
+    print(" ".join(fmt.format(result[name]) for name, fmt in COLUMNS))
+
+
+async def async_main(sizes, rounds, probe_interval, memory_sample):
+    """Run the benchmark for each fleet size."""
+    _print_header()
+    for players in sizes:
+        _print_row(
+            await async_run(
+                players, rounds, probe_interval, min(players, memory_sample)
+            )
+        )
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--players",
+        default="10,100,1000,5000",
+        help="comma separated fleet sizes",
+    )
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument(
+        "--probe-interval",
+        type=float,
+        default=0.005,
+        help="seconds between event loop latency probes",
+    )
+    parser.add_argument(
+        "--memory-sample",
+        type=int,
+        default=200,
+        help="players set up under tracemalloc to measure memory per entity",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.players.split(",")]
+    asyncio.run(async_main(sizes, args.rounds, args.probe_interval, args.memory_sample))
+
+
+if __name__ == "__main__":
+    main()
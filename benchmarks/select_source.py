@@ -0,0 +1,91 @@
+"""Latency from a select_source call to the first step of the input script.
+
+Both runs go through ``async_select_source``. The per-call run empties the
+entity's script cache before each call, so a ``Script`` is built every time as
+the entity used to do; the cached run reuses the per-entity scripts.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from homeassistant.core import Context, callback
+
+from .common import async_setup_players, async_start_hass
+
+EVENT = "media_player_template_bench_step"
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _report(label, samples):
+    print(
+        f"{label:<16} n={len(samples):<6} "
+        f"mean={statistics.mean(samples) * 1e6:8.1f}us "
+        f"p50={_percentile(samples, 50) * 1e6:8.1f}us "
+        f"p99={_percentile(samples, 99) * 1e6:8.1f}us"
+    )
+
+
+async def _async_measure(hass, calls, select):
+    """Time ``calls`` invocations of ``select`` up to the script's first step."""
+    stepped = []
+
+    @callback
+    def _async_stepped(event):
+        stepped.append(time.perf_counter())
+
+    unsub = hass.bus.async_listen(EVENT, _async_stepped)
+    samples = []
+    for index in range(calls):
+        start = time.perf_counter()
+        await select(index)
+        await hass.async_block_till_done()
+        samples.append(stepped[-1] - start)
+    unsub()
+    return samples
+
+
+async def async_main(calls, sources, steps):
+    """Run the benchmark."""
+    hass = await async_start_hass()
+    sequence = [{"event": EVENT}] + [
+        {"event": f"{EVENT}_tail", "event_data": {"step": "{{ %d }}" % step}}
+        for step in range(steps - 1)
+    ]
+    inputs = {f"source {i}": sequence for i in range(sources)}
+    (player,) = await async_setup_players(
+        hass, {"bench": {"value_template": "on", "inputs": inputs}}
+    )
+    names = list(inputs)
+
+    async def per_call_script(index):
+        player._input_scripts.clear()
+        await cached_script(index)
+
+    async def cached_script(index):
+        # Service calls set a context before dispatching to the entity.
+        player.async_set_context(Context())
+        await player.async_select_source(names[index % sources])
+
+    await _async_measure(hass, sources, cached_script)  # Warm up.
+    _report("per-call Script", await _async_measure(hass, calls, per_call_script))
+    _report("cached Script", await _async_measure(hass, calls, cached_script))
+    await hass.async_stop()
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--sources", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(async_main(args.calls, args.sources, args.steps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Startup cost of players that configure every action.
+
+Sets up N players, each with a script for all of its actions, and reports the
+setup time, memory per entity and the time of the first call to an action.
+
+    python -m benchmarks.startup --players 1000
+    python -m benchmarks.startup --players 1000 --warm-up play,pause
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from homeassistant.core import Context
+
+# Through common, which loads Home Assistant in the right order first.
+from .common import async_setup_players, async_start_hass, media_player
+
+
+def player_config(index, warm_up):
+    """Return a raw media player config with a script for every action."""
+    config = {
+        action: [
+            {"event": f"bench_{action}", "event_data": {"player": index}},
+            {"delay": 0},
+        ]
+        for action in media_player.ACTION_FEATURES
+    }
+    config["value_template"] = "{{ states('input_text.receiver') }}"
+    if warm_up:
+        config["warm_up"] = warm_up
+    return config
+
+
+async def async_run(players, warm_up, memory_sample):
+    """Set up ``players`` and return the measurements."""
+    hass = await async_start_hass()
+    hass.states.async_set("input_text.receiver", "playing")
+    await hass.async_block_till_done()
+
+    gc.collect()
+    start = time.perf_counter()
+    entities = await async_setup_players(
+        hass, {f"p{index}": player_config(index, warm_up) for index in range(players)}
+    )
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for entity in entities:
+        # Service calls set a context before dispatching to the entity.
+        entity.async_set_context(Context())
+        await entity.async_media_pause()
+    first_call = (time.perf_counter() - start) / players
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await async_setup_players(
+        hass,
+        {f"m{index}": player_config(index, warm_up) for index in range(memory_sample)},
+    )
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    memory = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    await hass.async_stop()
+    return setup_time, first_call, memory / memory_sample
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument(
+        "--warm-up", default="", help="comma separated actions to build up front"
+    )
+    parser.add_argument("--memory-sample", type=int, default=200)
+    args = parser.parse_args()
+    warm_up = [action for action in args.warm_up.split(",") if action]
+    setup_time, first_call, memory = asyncio.run(
+        async_run(args.players, warm_up, min(args.players, args.memory_sample))
+    )
+    print(
+        f"players={args.players} setup={setup_time:.3f}s "
+        f"first_pause={first_call * 1e6:.1f}us bytes_per_entity={memory:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
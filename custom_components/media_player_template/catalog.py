@@ -0,0 +1,284 @@
+"""Browsable and searchable media catalog of the template media player."""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque
+import heapq
+import json
+import os
+import re
+
+from homeassistant.components.media_player import BrowseMedia, MediaClass
+from homeassistant.components.media_player.errors import BrowseError
+from homeassistant.util.yaml import load_yaml
+
+CONF_TITLE = "title"
+CONF_CHILDREN = "children"
+CONF_MEDIA_CONTENT_ID = "media_content_id"
+CONF_MEDIA_CONTENT_TYPE = "media_content_type"
+CONF_MEDIA_CLASS = "media_class"
+CONF_THUMBNAIL = "thumbnail"
+
+# Children shown per page of a directory, a last "More" entry opens the next.
+CATALOG_PAGE_SIZE = 200
+
+# Content ids of catalog directories and pages: prefix, node index and offset.
+CATALOG_ID_PREFIX = "media_player_template/catalog/"
+
+# Seconds between checks whether a catalog file changed.
+CATALOG_CHECK_INTERVAL = 30
+
+# Search results returned unless asked otherwise.
+SEARCH_LIMIT = 50
+
+# Shorter query words would expand to most of the catalog, they only narrow
+# down the matches of longer words or match whole title words.
+SEARCH_MIN_PREFIX = 2
+
+# Catalogs with more nodes are searched in the executor, ranking the matches
+# of a common word takes too long for the event loop.
+SEARCH_INLINE_NODES = 2000
+
+_WORD_RE = re.compile(r"\w+")
+
+# Fields of a node tuple: title, content id, content type, media class,
+# thumbnail, index of the first child and number of children.
+_TITLE = 0
+_MEDIA_CLASS = 3
+_FIRST = 5
+_COUNT = 6
+
+
+def load_catalog(source, config_dir):
+    """Load a catalog from a JSON or YAML file, or build it from inline config.
+
+    Does blocking I/O, run it in the executor.
+    """
+    mtime = None
+    if isinstance(source, str):
+        path = os.path.join(config_dir, source)
+        mtime = os.stat(path).st_mtime
+        if path.endswith(".json"):
+            with open(path, encoding="utf-8") as file:
+                source = json.load(file)
+        else:
+            source = load_yaml(path)
+    return MediaCatalog(source, mtime)
+
+
+def reload_catalog(catalog, source, config_dir):
+    """Return the catalog loaded again if its file changed, else None.
+
+    Does blocking I/O, run it in the executor.
+    """
+    if os.stat(os.path.join(config_dir, source)).st_mtime == catalog.mtime:
+        return None
+    return load_catalog(source, config_dir)
+
+
+def _words(text):
+    """Return the distinct lowercase words of text."""
+    return set(_WORD_RE.findall(text.casefold()))
+
+
+class MediaCatalog:
+    """Tree of media items, indexed for browsing and search.
+
+    Nodes are stored as tuples in breadth-first order, so the children of a
+    directory are one contiguous slice and a page of them is cut without
+    walking the tree. BrowseMedia objects are only built for the page asked
+    for. Title words are kept sorted with the nodes containing them, so a
+    search word is looked up as a prefix with a binary search.
+    """
+
+    __slots__ = ("mtime", "_nodes", "_words", "_postings")
+
+    def __init__(self, root, mtime=None):
+        """Index the catalog rooted at root, a dict as in the configuration."""
+        self.mtime = mtime
+        if isinstance(root, list):
+            root = {CONF_TITLE: "Media", CONF_CHILDREN: root}
+        if not isinstance(root, dict) or not isinstance(root.get(CONF_CHILDREN), list):
+            raise ValueError(f"The catalog root needs {CONF_CHILDREN}")
+        self._nodes = []
+        pending = deque([root])
+        # The next free index, children get consecutive ones.
+        next_index = 1
+        while pending:
+            node = pending.popleft()
+            if not isinstance(node, dict) or not node.get(CONF_TITLE):
+                raise ValueError(f"Catalog entry without a title: {node!r}")
+            children = node.get(CONF_CHILDREN)
+            if children is None:
+                if CONF_MEDIA_CONTENT_ID not in node:
+                    raise ValueError(
+                        f"Catalog item {node[CONF_TITLE]!r} has neither "
+                        f"{CONF_MEDIA_CONTENT_ID} nor {CONF_CHILDREN}"
+                    )
+                first, count = None, 0
+            else:
+                first, count = next_index, len(children)
+                next_index += count
+                pending.extend(children)
+            self._nodes.append(
+                (
+                    str(node[CONF_TITLE]),
+                    node.get(CONF_MEDIA_CONTENT_ID),
+                    node.get(CONF_MEDIA_CONTENT_TYPE, "music"),
+                    node.get(
+                        CONF_MEDIA_CLASS,
+                        MediaClass.MUSIC if first is None else MediaClass.DIRECTORY,
+                    ),
+                    node.get(CONF_THUMBNAIL),
+                    first,
+                    count,
+                )
+            )
+        postings = defaultdict(lambda: array("I"))
+        # The root is not a search result.
+        for index in range(1, len(self._nodes)):
+            for word in _words(self._nodes[index][_TITLE]):
+                postings[word].append(index)
+        self._words = sorted(postings)
+        self._postings = [postings[word] for word in self._words]
+
+    def __len__(self):
+        """Return the number of nodes."""
+        return len(self._nodes)
+
+    def browse(self, media_content_id=None):
+        """Return the directory page with media_content_id, the root if None."""
+        index, offset = 0, 0
+        if media_content_id:
+            if not media_content_id.startswith(CATALOG_ID_PREFIX):
+                raise BrowseError(f"Media not found: {media_content_id}")
+            index, _, offset = media_content_id[len(CATALOG_ID_PREFIX) :].partition("/")
+            try:
+                index, offset = int(index), int(offset or 0)
+                node = self._nodes[index]
+            except (IndexError, ValueError) as ex:
+                raise BrowseError(f"Media not found: {media_content_id}") from ex
+            if (
+                index < 0
+                or node[_FIRST] is None
+                or not 0 <= offset < max(node[_COUNT], 1)
+            ):
+                raise BrowseError(f"Media not found: {media_content_id}")
+        node = self._nodes[index]
+        first = node[_FIRST] + offset
+        end = node[_FIRST] + min(node[_COUNT], offset + CATALOG_PAGE_SIZE)
+        children = [self._browse_node(child) for child in range(first, end)]
+        remaining = node[_FIRST] + node[_COUNT] - end
+        if remaining:
+            children.append(
+                BrowseMedia(
+                    media_class=MediaClass.DIRECTORY,
+                    media_content_id=_page_id(index, offset + CATALOG_PAGE_SIZE),
+                    media_content_type=MediaClass.DIRECTORY,
+                    title=f"More ({remaining})",
+                    can_play=False,
+                    can_expand=True,
+                )
+            )
+        page = self._browse_node(index, offset)
+        page.children = children
+        return page
+
+    def search(self, query, limit=SEARCH_LIMIT, media_classes=None):
+        """Return the entries with title words starting with each query word.
+
+        Safe to call from the executor, a catalog is not changed once built.
+
+        Exact title matches come first, then titles starting with the query,
+        then shorter titles.
+        """
+        words = _words(query)
+        if not words:
+            return []
+        matches = None
+        # Long words match fewer titles, start with them.
+        for word in sorted(words, key=len, reverse=True):
+            if len(word) >= SEARCH_MIN_PREFIX:
+                matches = self._prefix_matches(word, matches)
+            elif matches is None:
+                matches = self._word_matches(word)
+            else:
+                matches = {
+                    index
+                    for index in matches
+                    if any(
+                        title_word.startswith(word)
+                        for title_word in _words(self._nodes[index][_TITLE])
+                    )
+                }
+            if not matches:
+                return []
+        if media_classes:
+            matches = [
+                index
+                for index in matches
+                if self._nodes[index][_MEDIA_CLASS] in media_classes
+            ]
+        text = " ".join(_WORD_RE.findall(query.casefold()))
+
+        def rank(index):
+            title = self._nodes[index][_TITLE].casefold()
+            return (title != text, not title.startswith(text), len(title), index)
+
+        return [
+            self._browse_node(index) for index in heapq.nsmallest(limit, matches, rank)
+        ]
+
+    def _word_matches(self, word):
+        """Return the nodes with word in their title."""
+        position = bisect_left(self._words, word)
+        if position < len(self._words) and self._words[position] == word:
+            return set(self._postings[position])
+        return set()
+
+    def _prefix_matches(self, word, within=None):
+        """Return the nodes with a title word starting with word, of within
+        if given."""
+        found = set()
+        start = bisect_left(self._words, word)
+        for position in range(start, len(self._words)):
+            if not self._words[position].startswith(word):
+                break
+            if within is None:
+                found.update(self._postings[position])
+            else:
+                found.update(
+                    index for index in self._postings[position] if index in within
+                )
+        return found
+
+    def _browse_node(self, index, offset=0):
+        """Return a node without its children."""
+        title, content_id, content_type, media_class, thumbnail, first, _ = self._nodes[
+            index
+        ]
+        if first is None:
+            return BrowseMedia(
+                media_class=media_class,
+                media_content_id=content_id,
+                media_content_type=content_type,
+                title=title,
+                can_play=True,
+                can_expand=False,
+                thumbnail=thumbnail,
+            )
+        return BrowseMedia(
+            media_class=media_class,
+            media_content_id=_page_id(index, offset),
+            media_content_type=MediaClass.DIRECTORY,
+            title=title,
+            can_play=False,
+            can_expand=True,
+            thumbnail=thumbnail,
+        )
+
+
+def _page_id(index, offset):
+    """Return the content id of a directory page."""
+    if offset:
+        return f"{CATALOG_ID_PREFIX}{index}/{offset}"
+    return f"{CATALOG_ID_PREFIX}{index}"
@@ -0,0 +1,246 @@
+"""Member players of a group template media player."""
+import asyncio
+from collections import Counter
+from functools import partial
+import logging
+
+from homeassistant.components.media_player import (
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+    DOMAIN as MEDIA_PLAYER_DOMAIN,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_SUPPORTED_FEATURES
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_state_change_event
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds a command waits for the members unless configured otherwise.
+DEFAULT_MEMBER_TIMEOUT = 10.0
+
+# Member states and the group state they count towards. Unknown and
+# unavailable members do not count.
+_MEMBER_STATES = {
+    "playing": "playing",
+    "buffering": "playing",
+    "paused": "paused",
+    "idle": "idle",
+    "on": "on",
+    "standby": "off",
+    "off": "off",
+}
+
+# Group states by precedence, the first one any member is in wins.
+_GROUP_STATES = ("playing", "paused", "idle", "on", "off")
+
+# Fields of the values a member counts with.
+_STATE = 0
+_FEATURES = 3
+
+
+class MemberGroup:
+    """Member media players of a group player.
+
+    The group state, volume, mute and the union of the member features are
+    kept as counts and sums. A member state change takes back what the member
+    counted with and adds its new values, so it costs the same for any number
+    of members. Commands go out to all members at once.
+    """
+
+    __slots__ = (
+        "members",
+        "timeout",
+        "calls",
+        "timeouts",
+        "errors",
+        "_hass",
+        "_on_change",
+        "_values",
+        "_states",
+        "_volume_sum",
+        "_volumes",
+        "_muted",
+        "_mutes",
+        "_features",
+    )
+
+    def __init__(self, hass, members, timeout, on_change):
+        """Initialize the group, on_change is called after member changes."""
+        self.members = members
+        self.timeout = timeout
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._hass = hass
+        self._on_change = on_change
+        # Per member: group state, volume, mute and features it counts with.
+        self._values = {}
+        self._states = Counter()
+        self._volume_sum = 0.0
+        self._volumes = 0
+        self._muted = 0
+        self._mutes = 0
+        # Members supporting each feature bit.
+        self._features = Counter()
+
+    @property
+    def state(self):
+        """Return the group state, None while no member state is known."""
+        for state in _GROUP_STATES:
+            if self._states[state] > 0:
+                return state
+        return None
+
+    @property
+    def volume_level(self):
+        """Return the mean volume of the members reporting one."""
+        if not self._volumes:
+            return None
+        return round(self._volume_sum / self._volumes, 4)
+
+    @property
+    def is_volume_muted(self):
+        """Return True if all members reporting mute are muted."""
+        if not self._mutes:
+            return None
+        return self._muted == self._mutes
+
+    @property
+    def supported_features(self):
+        """Return the features any member supports."""
+        features = 0
+        for bit, count in self._features.items():
+            if count > 0:
+                features |= bit
+        return features
+
+    def stats(self):
+        """Return command statistics."""
+        return {
+            "members": len(self.members),
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+    @callback
+    def async_start(self, entity_id):
+        """Count the current member states and follow their changes.
+
+        A group listed as its own member is left out. Returns a callback
+        that stops following the members.
+        """
+        self.members = tuple(member for member in self.members if member != entity_id)
+        for member in self.members:
+            self._async_update_member(member, self._hass.states.get(member))
+        return async_track_state_change_event(
+            self._hass, self.members, self._async_member_changed
+        )
+
+    @callback
+    def _async_member_changed(self, event):
+        """Count a member state change and report it."""
+        self._async_update_member(event.data["entity_id"], event.data["new_state"])
+        self._on_change(event)
+
+    @callback
+    def _async_update_member(self, member, state):
+        """Replace the values member counts with."""
+        old = self._values.pop(member, None)
+        if old is not None:
+            self._count(old, -1)
+        if state is None:
+            return
+        attributes = state.attributes
+        volume = attributes.get(ATTR_MEDIA_VOLUME_LEVEL)
+        muted = attributes.get(ATTR_MEDIA_VOLUME_MUTED)
+        values = self._values[member] = (
+            _MEMBER_STATES.get(state.state),
+            float(volume) if isinstance(volume, (int, float)) else None,
+            muted if isinstance(muted, bool) else None,
+            int(attributes.get(ATTR_SUPPORTED_FEATURES) or 0),
+        )
+        self._count(values, 1)
+
+    def _count(self, values, sign):
+        """Add member values to the aggregates, or take them back if sign is -1."""
+        state, volume, muted, features = values
+        if state is not None:
+            self._states[state] += sign
+        if volume is not None:
+            self._volumes += sign
+            # Start over when empty so rounding errors do not build up.
+            self._volume_sum = (
+                self._volume_sum + sign * volume if self._volumes else 0.0
+            )
+        if muted is not None:
+            self._mutes += sign
+            self._muted += sign * muted
+        while features:
+            bit = features & -features
+            self._features[bit] += sign
+            features ^= bit
+
+    async def async_call(self, service, features, data, context, repeat=1):
+        """Call a media player service on all members supporting any of
+        features at once.
+
+        Waits at most the timeout, members still busy then carry on in the
+        background. Raises HomeAssistantError if the call failed on every
+        member.
+        """
+        members = [
+            member
+            for member, values in self._values.items()
+            if values[_FEATURES] & features and values[_STATE] is not None
+        ]
+        if not members:
+            return
+        self.calls += 1
+        tasks = {
+            self._hass.async_create_task(
+                self._async_call_member(member, service, data, context, repeat)
+            ): member
+            for member in members
+        }
+        done, pending = await asyncio.wait(tasks, timeout=self.timeout)
+        for task in pending:
+            self.timeouts += 1
+            _LOGGER.warning(
+                "%s of %s did not finish within %s seconds, not waiting for it",
+                service,
+                tasks[task],
+                self.timeout,
+            )
+            task.add_done_callback(
+                partial(self._async_late_result, tasks[task], service)
+            )
+        failed = 0
+        for task in done:
+            error = None if task.cancelled() else task.exception()
+            if error is not None:
+                failed += 1
+                self.errors += 1
+                _LOGGER.error("%s of %s failed: %s", service, tasks[task], error)
+        if failed == len(members):
+            raise HomeAssistantError(f"{service} failed on all members")
+
+    async def _async_call_member(self, member, service, data, context, repeat):
+        """Call service on one member, repeat times."""
+        for _ in range(repeat):
+            await self._hass.services.async_call(
+                MEDIA_PLAYER_DOMAIN,
+                service,
+                {ATTR_ENTITY_ID: member, **data},
+                blocking=True,
+                context=context,
+            )
+
+    @callback
+    def _async_late_result(self, member, service, task):
+        """Log a call that failed after the group stopped waiting for it."""
+        error = None if task.cancelled() else task.exception()
+        if error is not None:
+            self.errors += 1
+            _LOGGER.error("%s of %s failed: %s", service, member, error)
@@ -0,0 +1,109 @@
+"""Platform-wide index of the entities template media players depend on."""
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    EVENT_HOMEASSISTANT_STOP,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import callback
+
+DATA_INDEX = "media_player_template_index"
+
+
+@callback
+def async_get_index(hass):
+    """Return the dependency index of the platform, creating it on first use."""
+    index = hass.data.get(DATA_INDEX)
+    if index is None:
+        index = hass.data[DATA_INDEX] = DependencyIndex(hass)
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, index.async_stop)
+    return index
+
+
+class DependencyIndex:
+    """Map upstream entity ids to the tracked templates that read them.
+
+    One state changed listener serves all template trackers of the platform.
+    A state change is looked up once and handed to each tracker with the
+    templates of that tracker that read the entity. The listener is kept once
+    created, as re-indexing a render can empty the index for a moment and
+    a new listener would miss state changes already queued for the old one.
+    """
+
+    def __init__(self, hass):
+        """Initialize an empty index."""
+        self._hass = hass
+        self._by_entity = {}
+        self._unsub = None
+
+    @callback
+    def async_add(self, entity_id, tracker, tracked):
+        """Record that tracked, owned by tracker, reads entity_id."""
+        trackers = self._by_entity.get(entity_id)
+        if trackers is None:
+            trackers = self._by_entity[entity_id] = {}
+            if self._unsub is None:
+                self._unsub = self._hass.bus.async_listen(
+                    EVENT_STATE_CHANGED,
+                    self._async_state_changed,
+                    event_filter=self._async_filter,
+                )
+        trackers.setdefault(tracker, set()).add(tracked)
+
+    @callback
+    def async_remove(self, entity_id, tracker, tracked):
+        """Forget that tracked reads entity_id."""
+        trackers = self._by_entity.get(entity_id)
+        if trackers is None or tracker not in trackers:
+            return
+        templates = trackers[tracker]
+        templates.discard(tracked)
+        if templates:
+            return
+        del trackers[tracker]
+        if not trackers:
+            del self._by_entity[entity_id]
+
+    @callback
+    def async_stop(self, _event=None):
+        """Remove the state changed listener and forget the index."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._by_entity.clear()
+        if self._hass.data.get(DATA_INDEX) is self:
+            del self._hass.data[DATA_INDEX]
+
+    def fan_out(self):
+        """Return the number of dependent templates per upstream entity id."""
+        return {
+            entity_id: sum(len(templates) for templates in trackers.values())
+            for entity_id, trackers in self._by_entity.items()
+        }
+
+    def dependants(self, entity_id):
+        """Return (player entity id, template key) pairs reading entity_id."""
+        return sorted(
+            (tracker.entity_id, tracked.key)
+            for tracker, templates in self._by_entity.get(entity_id, {}).items()
+            for tracked in templates
+        )
+
+    @callback
+    def _async_filter(self, event):
+        """Only pass state changes of indexed entities.
+
+        Home Assistant 2024.4 and later pass the event data, older versions
+        the event.
+        """
+        data = getattr(event, "data", event)
+        return data[ATTR_ENTITY_ID] in self._by_entity
+
+    @callback
+    def _async_state_changed(self, event):
+        """Hand a state change to the trackers with templates reading it."""
+        trackers = self._by_entity.get(event.data[ATTR_ENTITY_ID])
+        if trackers is None:
+            return
+        # Rendering re-indexes templates, so work on a snapshot.
+        for tracker, templates in list(trackers.items()):
+            tracker.async_entity_changed(event, list(templates))
@@ -2,23 +2,36 @@
 Template for media-player
 https://github.com/Sennevds/media_player.template
 """
+import asyncio
+from dataclasses import dataclass
+from functools import reduce
 import logging
+from operator import or_
+import time
 
 import homeassistant.helpers.config_validation as cv
 import homeassistant.util.dt as dt_util
 import voluptuous as vol
 from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_CONTENT_ID,
+    ATTR_MEDIA_CONTENT_TYPE,
+    ATTR_MEDIA_ENQUEUE,
+    ATTR_MEDIA_SEEK_POSITION,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+    ATTR_SOUND_MODE,
+    DOMAIN as MEDIA_PLAYER_DOMAIN,
     ENTITY_ID_FORMAT,
     PLATFORM_SCHEMA,
+    SERVICE_PLAY_MEDIA,
+    SERVICE_SELECT_SOUND_MODE,
+    SERVICE_SELECT_SOURCE,
     MediaPlayerEntity,
     MediaPlayerEntityFeature,
     MediaPlayerState,
 )
-from homeassistant.components.template.const import (
-    CONF_AVAILABILITY_TEMPLATE,
-    DOMAIN,
-    PLATFORMS,
-)
+from homeassistant.components.template.const import CONF_AVAILABILITY_TEMPLATE
 from homeassistant.components.template.template_entity import TemplateEntity
 from homeassistant.const import (
     ATTR_ENTITY_ID,
@@ -26,27 +39,81 @@ from homeassistant.const import (
     CONF_DEVICE_CLASS,
     CONF_ENTITY_PICTURE_TEMPLATE,
     CONF_ICON_TEMPLATE,
+    CONF_MODE,
     CONF_UNIQUE_ID,
     CONF_VALUE_TEMPLATE,
-    STATE_UNKNOWN,
+    SERVICE_MEDIA_NEXT_TRACK,
+    SERVICE_MEDIA_PAUSE,
+    SERVICE_MEDIA_PLAY,
+    SERVICE_MEDIA_PREVIOUS_TRACK,
+    SERVICE_MEDIA_SEEK,
+    SERVICE_MEDIA_STOP,
+    SERVICE_RELOAD,
+    SERVICE_TURN_OFF,
+    SERVICE_TURN_ON,
+    SERVICE_VOLUME_DOWN,
+    SERVICE_VOLUME_MUTE,
+    SERVICE_VOLUME_SET,
+    SERVICE_VOLUME_UP,
 )
+from homeassistant.components.media_player.errors import BrowseError
 from homeassistant.core import callback
-from homeassistant.exceptions import TemplateError
+from homeassistant.exceptions import HomeAssistantError, TemplateError
 from homeassistant.helpers.entity import async_generate_entity_id
-from homeassistant.helpers.reload import async_setup_reload_service
-from homeassistant.helpers.script import Script
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers import config_per_platform
+from homeassistant.helpers.restore_state import RestoredExtraData, RestoreEntity
+from homeassistant.helpers.reload import (
+    async_get_platform_without_config_entry,
+    async_integration_yaml_config,
+)
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.helpers.script import (
+    CONF_MAX,
+    DEFAULT_MAX,
+    DEFAULT_SCRIPT_MODE,
+    SCRIPT_MODE_CHOICES,
+    SCRIPT_MODE_PARALLEL,
+    SCRIPT_MODE_QUEUED,
+    SCRIPT_MODE_RESTART,
+    SCRIPT_MODE_SINGLE,
+    Script,
+)
+from homeassistant.helpers.template import TemplateStateFromEntityId
+
+from .catalog import (
+    CATALOG_CHECK_INTERVAL,
+    SEARCH_INLINE_NODES,
+    SEARCH_LIMIT,
+    load_catalog,
+    reload_catalog,
+)
+from .group import DEFAULT_MEMBER_TIMEOUT, MemberGroup
+from .parsers import (
+    PLAYER_STATES,
+    parse_bool,
+    parse_float,
+    parse_state,
+    parse_volume,
+)
+from .play_queue import MAX_QUEUE_SIZE, PlayQueue
+from .position import MediaPosition
+from .profiler import async_profiled, profiled
+from .services import DATA_ENTITIES, DATA_PROFILER, DOMAIN, async_setup_services
+from .startup import async_get_startup_queue
+from .stats import ActionStats
+from .tracker import TemplateTracker
+
+try:
+    from homeassistant.components.media_player import SearchMedia
+except ImportError:  # Home Assistant without media search
+    SearchMedia = None
 
 _LOGGER = logging.getLogger(__name__)
-_VALID_STATES = [
-    MediaPlayerState.ON,
-    MediaPlayerState.OFF,
-    "true",
-    "false",
-    MediaPlayerState.IDLE,
-    MediaPlayerState.PAUSED,
-    MediaPlayerState.PLAYING,
-]
+# Player states that have a position and duration.
+_MEDIA_STATES = (MediaPlayerState.PLAYING, MediaPlayerState.PAUSED)
 CONF_AVAILABILITY_TEMPLATE = "availability_template"
+ICON_VALIDATOR = vol.Or(cv.whitespace, cv.icon)
 CONF_MEDIAPLAYER = "media_players"
 ON_ACTION = "turn_on"
 OFF_ACTION = "turn_off"
@@ -76,320 +143,493 @@ MEDIA_SEASON_TEMPLATE = "media_season_template"
 MEDIA_SERIES_TITLE_TEMPLATE = "media_series_title_template"
 MEDIA_ALBUM_ARTIST_TEMPLATE = "media_album_artist_template"
 SEEK_ACTION = "seek"
+SELECT_SOURCE_ACTION = "select_source"
+SELECT_SOUND_MODE_ACTION = "select_sound_mode"
 CURRENT_POSITION_TEMPLATE = "current_position_template"
 MEDIA_DURATION_TEMPLATE = "media_duration_template"
 CURRENT_SOUND_MODE_TEMPLATE = "current_sound_mode_template"
 CONF_SOUND_MODES = "sound_modes"
+CONF_WRITE_COALESCE_MS = "write_coalesce_ms"
+CONF_RATE_LIMITS = "rate_limits"
+CONF_UPDATE_INTERVALS = "update_intervals"
+CONF_VOLUME_STEP_WINDOW_MS = "volume_step_window_ms"
+CONF_VOLUME_STEP = "volume_step"
+CONF_ACTION_MODES = "action_modes"
+CONF_WARM_UP = "warm_up"
+CONF_QUEUE_SIZE = "queue_size"
+CONF_MEDIA_LIBRARY = "media_library"
+CONF_MEMBERS = "members"
+CONF_MEMBER_TIMEOUT = "member_timeout"
+
+# Seek and volume drags fire many calls, only the latest one matters.
+DEFAULT_ACTION_MODES = {
+    SEEK_ACTION: {CONF_MODE: SCRIPT_MODE_RESTART},
+    SET_VOLUME_ACTION: {CONF_MODE: SCRIPT_MODE_RESTART},
+}
+ACTION_MODE_SCHEMA = vol.Any(
+    vol.All(vol.In(SCRIPT_MODE_CHOICES), lambda mode: {CONF_MODE: mode}),
+    vol.Schema(
+        {
+            vol.Required(CONF_MODE): vol.In(SCRIPT_MODE_CHOICES),
+            vol.Optional(CONF_MAX): vol.All(vol.Coerce(int), vol.Range(min=2)),
+        }
+    ),
+)
 
-
-MEDIA_PLAYER_SCHEMA = vol.Schema(
+# Templates tracked by the entity itself, and the subset that is only tracked
+# while the player is on and available.
+METADATA_TEMPLATES = frozenset(
     {
-        vol.Required(CONF_VALUE_TEMPLATE): cv.template,
-        vol.Optional(CONF_ICON_TEMPLATE): cv.template,
-        vol.Optional(CONF_DEVICE_CLASS): cv.string,
-        vol.Optional(CONF_UNIQUE_ID): cv.string,
-        vol.Optional(CONF_ENTITY_PICTURE_TEMPLATE): cv.template,
-        vol.Optional(CONF_AVAILABILITY_TEMPLATE): cv.template,
-        vol.Optional(CURRENT_SOURCE_TEMPLATE): cv.template,
-        vol.Optional(ON_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(OFF_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(PLAY_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(STOP_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(PAUSE_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(NEXT_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(PREVIOUS_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(VOLUME_UP_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(VOLUME_DOWN_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(MUTE_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(CONF_INPUTS, default={}): {cv.string: cv.SCRIPT_SCHEMA},
-        vol.Optional(ATTR_FRIENDLY_NAME): cv.string,
-        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
-        vol.Optional(SET_VOLUME_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(PLAY_MEDIA_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(TITLE_TEMPLATE): cv.template,
-        vol.Optional(ARTIST_TEMPLATE): cv.template,
-        vol.Optional(ALBUM_TEMPLATE): cv.template,
-        vol.Optional(CURRENT_VOLUME_TEMPLATE): cv.template,
-        vol.Optional(CURRENT_IS_MUTED_TEMPLATE): cv.template,
-        vol.Optional(ALBUM_ART_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_CONTENT_TYPE_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_IMAGE_URL_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_IMAGE_URL_REMOTELY_ACCESSIBLE): cv.boolean,
-        vol.Optional(MEDIA_EPISODE_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_SEASON_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_SERIES_TITLE_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_ALBUM_ARTIST_TEMPLATE): cv.template,
-        vol.Optional(SEEK_ACTION): cv.SCRIPT_SCHEMA,
-        vol.Optional(CURRENT_POSITION_TEMPLATE): cv.template,
-        vol.Optional(MEDIA_DURATION_TEMPLATE): cv.template,
-        vol.Optional(CONF_SOUND_MODES, default={}): {cv.string: cv.SCRIPT_SCHEMA},
-        vol.Optional(CURRENT_SOUND_MODE_TEMPLATE): cv.template,
+        TITLE_TEMPLATE,
+        ARTIST_TEMPLATE,
+        ALBUM_TEMPLATE,
+        ALBUM_ART_TEMPLATE,
+        MEDIA_CONTENT_TYPE_TEMPLATE,
+        MEDIA_IMAGE_URL_TEMPLATE,
+        MEDIA_EPISODE_TEMPLATE,
+        MEDIA_SEASON_TEMPLATE,
+        MEDIA_SERIES_TITLE_TEMPLATE,
+        MEDIA_ALBUM_ARTIST_TEMPLATE,
+        CURRENT_POSITION_TEMPLATE,
+        MEDIA_DURATION_TEMPLATE,
+        CURRENT_SOUND_MODE_TEMPLATE,
     }
 )
+TRACKED_TEMPLATES = METADATA_TEMPLATES | {
+    CURRENT_SOURCE_TEMPLATE,
+    CURRENT_VOLUME_TEMPLATE,
+    CURRENT_IS_MUTED_TEMPLATE,
+}
+
+# Template key, the attribute its result is stored in and the method handling
+# the result instead, in tracking order. Availability goes first so the state
+# is handled knowing it.
+TEMPLATE_ATTRIBUTES = (
+    (CONF_AVAILABILITY_TEMPLATE, "_attr_available", "_update_available"),
+    (CONF_VALUE_TEMPLATE, "_state", "_update_state"),
+    (CONF_ICON_TEMPLATE, "_attr_icon", "_update_icon"),
+    (CONF_ENTITY_PICTURE_TEMPLATE, "_attr_entity_picture", None),
+    (CURRENT_SOURCE_TEMPLATE, "_current_source", None),
+    (CURRENT_VOLUME_TEMPLATE, "_volume", "_update_volume"),
+    (CURRENT_IS_MUTED_TEMPLATE, "_is_muted", None),
+    (TITLE_TEMPLATE, "_track_name", None),
+    (ARTIST_TEMPLATE, "_track_artist", None),
+    (ALBUM_TEMPLATE, "_track_album_name", None),
+    (ALBUM_ART_TEMPLATE, "_album_art", None),
+    (MEDIA_CONTENT_TYPE_TEMPLATE, "_media_content_type", None),
+    (MEDIA_IMAGE_URL_TEMPLATE, "_media_image_url", None),
+    (MEDIA_EPISODE_TEMPLATE, "_media_episode", None),
+    (MEDIA_SEASON_TEMPLATE, "_media_season", None),
+    (MEDIA_SERIES_TITLE_TEMPLATE, "_media_series_title", None),
+    (MEDIA_ALBUM_ARTIST_TEMPLATE, "_media_album_artist", None),
+    (CURRENT_POSITION_TEMPLATE, "_current_position", "_update_position"),
+    (MEDIA_DURATION_TEMPLATE, "_media_duration", "_update_duration"),
+    (CURRENT_SOUND_MODE_TEMPLATE, "_sound_mode", None),
+)
+
+# Attributes persisted across restarts and shown until the templates rendered.
+RESTORED_ATTRIBUTES = (
+    "_state",
+    "_current_source",
+    "_sound_mode",
+    "_volume",
+    "_is_muted",
+    "_track_name",
+    "_track_artist",
+    "_track_album_name",
+    "_album_art",
+    "_media_image_url",
+    "_media_episode",
+    "_media_season",
+    "_media_series_title",
+    "_media_album_artist",
+    "_media_content_type",
+    "_media_duration",
+)
+
+# Newer Home Assistant versions only pass enqueue to players flagging it.
+MEDIA_ENQUEUE_FEATURE = getattr(MediaPlayerEntityFeature, "MEDIA_ENQUEUE", 0)
+SEARCH_MEDIA_FEATURE = getattr(MediaPlayerEntityFeature, "SEARCH_MEDIA", 0)
+
+# Features of a media library, only offered while its items can be played.
+MEDIA_LIBRARY_FEATURES = MediaPlayerEntityFeature.BROWSE_MEDIA | SEARCH_MEDIA_FEATURE
+
+# Actions and the feature each one provides.
+ACTION_FEATURES = {
+    ON_ACTION: MediaPlayerEntityFeature.TURN_ON,
+    OFF_ACTION: MediaPlayerEntityFeature.TURN_OFF,
+    PLAY_ACTION: MediaPlayerEntityFeature.PLAY,
+    STOP_ACTION: MediaPlayerEntityFeature.STOP,
+    PAUSE_ACTION: MediaPlayerEntityFeature.PAUSE,
+    NEXT_ACTION: MediaPlayerEntityFeature.NEXT_TRACK,
+    PREVIOUS_ACTION: MediaPlayerEntityFeature.PREVIOUS_TRACK,
+    VOLUME_UP_ACTION: MediaPlayerEntityFeature.VOLUME_STEP,
+    VOLUME_DOWN_ACTION: MediaPlayerEntityFeature.VOLUME_STEP,
+    MUTE_ACTION: MediaPlayerEntityFeature.VOLUME_MUTE,
+    SET_VOLUME_ACTION: MediaPlayerEntityFeature.VOLUME_SET,
+    PLAY_MEDIA_ACTION: MediaPlayerEntityFeature.PLAY_MEDIA,
+    SEEK_ACTION: MediaPlayerEntityFeature.SEEK,
+}
+
+# Actions of group players without a script, as the media player service
+# called on the members: service, the member features of which one is needed
+# and the service fields filled from the action variables.
+MEMBER_SERVICES = {
+    ON_ACTION: (SERVICE_TURN_ON, MediaPlayerEntityFeature.TURN_ON, {}),
+    OFF_ACTION: (SERVICE_TURN_OFF, MediaPlayerEntityFeature.TURN_OFF, {}),
+    PLAY_ACTION: (SERVICE_MEDIA_PLAY, MediaPlayerEntityFeature.PLAY, {}),
+    STOP_ACTION: (SERVICE_MEDIA_STOP, MediaPlayerEntityFeature.STOP, {}),
+    PAUSE_ACTION: (SERVICE_MEDIA_PAUSE, MediaPlayerEntityFeature.PAUSE, {}),
+    NEXT_ACTION: (SERVICE_MEDIA_NEXT_TRACK, MediaPlayerEntityFeature.NEXT_TRACK, {}),
+    PREVIOUS_ACTION: (
+        SERVICE_MEDIA_PREVIOUS_TRACK,
+        MediaPlayerEntityFeature.PREVIOUS_TRACK,
+        {},
+    ),
+    # Members with only set volume step through their own volume up and down.
+    VOLUME_UP_ACTION: (
+        SERVICE_VOLUME_UP,
+        MediaPlayerEntityFeature.VOLUME_STEP | MediaPlayerEntityFeature.VOLUME_SET,
+        {},
+    ),
+    VOLUME_DOWN_ACTION: (
+        SERVICE_VOLUME_DOWN,
+        MediaPlayerEntityFeature.VOLUME_STEP | MediaPlayerEntityFeature.VOLUME_SET,
+        {},
+    ),
+    MUTE_ACTION: (
+        SERVICE_VOLUME_MUTE,
+        MediaPlayerEntityFeature.VOLUME_MUTE,
+        {ATTR_MEDIA_VOLUME_MUTED: "is_muted"},
+    ),
+    SET_VOLUME_ACTION: (
+        SERVICE_VOLUME_SET,
+        MediaPlayerEntityFeature.VOLUME_SET,
+        {ATTR_MEDIA_VOLUME_LEVEL: "volume"},
+    ),
+    PLAY_MEDIA_ACTION: (
+        SERVICE_PLAY_MEDIA,
+        MediaPlayerEntityFeature.PLAY_MEDIA,
+        {
+            ATTR_MEDIA_CONTENT_TYPE: "media_type",
+            ATTR_MEDIA_CONTENT_ID: "media_id",
+            ATTR_MEDIA_ENQUEUE: "enqueue",
+        },
+    ),
+    SEEK_ACTION: (
+        SERVICE_MEDIA_SEEK,
+        MediaPlayerEntityFeature.SEEK,
+        {ATTR_MEDIA_SEEK_POSITION: "position"},
+    ),
+}
+
+# Features a group player takes over from its members.
+MEMBER_FEATURES = reduce(
+    or_,
+    (features for _, features, _ in MEMBER_SERVICES.values()),
+    MediaPlayerEntityFeature.SELECT_SOURCE | MediaPlayerEntityFeature.SELECT_SOUND_MODE,
+)
+
+# Parsers turning rendered results into typed values, applied once per result.
+TEMPLATE_PARSERS = {
+    CONF_VALUE_TEMPLATE: parse_state,
+    CURRENT_VOLUME_TEMPLATE: parse_volume,
+    CURRENT_IS_MUTED_TEMPLATE: parse_bool,
+    CURRENT_POSITION_TEMPLATE: parse_float,
+    MEDIA_DURATION_TEMPLATE: parse_float,
+}
+
+# Restored attributes are parsed like the results of their templates.
+RESTORE_PARSERS = {
+    attribute: TEMPLATE_PARSERS[key]
+    for key, attribute, _ in TEMPLATE_ATTRIBUTES
+    if key in TEMPLATE_PARSERS
+}
+
+
+MEDIA_PLAYER_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(CONF_VALUE_TEMPLATE): cv.template,
+            vol.Optional(CONF_ICON_TEMPLATE): cv.template,
+            vol.Optional(CONF_DEVICE_CLASS): cv.string,
+            vol.Optional(CONF_UNIQUE_ID): cv.string,
+            vol.Optional(CONF_ENTITY_PICTURE_TEMPLATE): cv.template,
+            vol.Optional(CONF_AVAILABILITY_TEMPLATE): cv.template,
+            vol.Optional(CURRENT_SOURCE_TEMPLATE): cv.template,
+            vol.Optional(ON_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(OFF_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(PLAY_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(STOP_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(PAUSE_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(NEXT_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(PREVIOUS_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(VOLUME_UP_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(VOLUME_DOWN_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(MUTE_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(CONF_INPUTS, default={}): {cv.string: cv.SCRIPT_SCHEMA},
+            vol.Optional(ATTR_FRIENDLY_NAME): cv.string,
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Optional(SET_VOLUME_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(PLAY_MEDIA_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(TITLE_TEMPLATE): cv.template,
+            vol.Optional(ARTIST_TEMPLATE): cv.template,
+            vol.Optional(ALBUM_TEMPLATE): cv.template,
+            vol.Optional(CURRENT_VOLUME_TEMPLATE): cv.template,
+            vol.Optional(CURRENT_IS_MUTED_TEMPLATE): cv.template,
+            vol.Optional(ALBUM_ART_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_CONTENT_TYPE_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_IMAGE_URL_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_IMAGE_URL_REMOTELY_ACCESSIBLE): cv.boolean,
+            vol.Optional(MEDIA_EPISODE_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_SEASON_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_SERIES_TITLE_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_ALBUM_ARTIST_TEMPLATE): cv.template,
+            vol.Optional(SEEK_ACTION): cv.SCRIPT_SCHEMA,
+            vol.Optional(CURRENT_POSITION_TEMPLATE): cv.template,
+            vol.Optional(MEDIA_DURATION_TEMPLATE): cv.template,
+            vol.Optional(CONF_SOUND_MODES, default={}): {cv.string: cv.SCRIPT_SCHEMA},
+            vol.Optional(CURRENT_SOUND_MODE_TEMPLATE): cv.template,
+            vol.Optional(CONF_WRITE_COALESCE_MS, default=0): cv.positive_int,
+            vol.Optional(CONF_RATE_LIMITS, default={}): {
+                vol.In(TRACKED_TEMPLATES): cv.positive_time_period
+            },
+            vol.Optional(CONF_UPDATE_INTERVALS, default={}): {
+                vol.In(TRACKED_TEMPLATES): cv.positive_time_period
+            },
+            vol.Optional(CONF_VOLUME_STEP_WINDOW_MS, default=0): cv.positive_int,
+            vol.Optional(CONF_VOLUME_STEP, default=0.1): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False, max=1)
+            ),
+            vol.Optional(CONF_ACTION_MODES, default={}): {
+                vol.In(list(ACTION_FEATURES)): ACTION_MODE_SCHEMA
+            },
+            vol.Optional(CONF_WARM_UP, default=[]): vol.All(
+                cv.ensure_list, [vol.In(list(ACTION_FEATURES))]
+            ),
+            vol.Optional(CONF_QUEUE_SIZE, default=0): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=MAX_QUEUE_SIZE)
+            ),
+            # A file in the config directory, or the catalog itself.
+            vol.Optional(CONF_MEDIA_LIBRARY): vol.Any(cv.string, dict, list),
+            vol.Optional(CONF_MEMBERS, default=[]): cv.entity_ids,
+            vol.Optional(CONF_MEMBER_TIMEOUT, default=DEFAULT_MEMBER_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False)
+            ),
+        }
+    ),
+    # Group players take their state from the members.
+    cv.has_at_least_one_key(CONF_VALUE_TEMPLATE, CONF_MEMBERS),
+)
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {vol.Required(CONF_MEDIAPLAYER): cv.schema_with_slug_keys(MEDIA_PLAYER_SCHEMA)}
 )
 
 
+@dataclass(frozen=True, slots=True)
+class PlayerConfig:
+    """Validated configuration of one media player.
+
+    Templates and actions only hold the configured ones, keyed by their
+    config key. Equal configs build equal players, which reload relies on.
+    """
+
+    key: str
+    name: str
+    device_class: str
+    unique_id: str
+    templates: dict
+    actions: dict
+    action_modes: dict
+    warm_up: tuple
+    inputs: dict
+    sound_modes: dict
+    image_remotely_accessible: bool
+    write_coalesce: float
+    rate_limits: dict
+    update_intervals: dict
+    volume_step_window: float
+    volume_step: float
+    queue_size: int
+    media_library: object
+    members: tuple
+    member_timeout: float
+
+    @classmethod
+    def from_config(cls, key, config):
+        """Build the config of player key from its validated schema."""
+        return cls(
+            key=key,
+            name=config.get(ATTR_FRIENDLY_NAME, key),
+            device_class=config.get(CONF_DEVICE_CLASS, key),
+            unique_id=config.get(CONF_UNIQUE_ID),
+            templates={
+                template_key: config[template_key]
+                for template_key, _, _ in TEMPLATE_ATTRIBUTES
+                if template_key in config
+            },
+            actions={
+                action: config[action] for action in ACTION_FEATURES if action in config
+            },
+            action_modes={**DEFAULT_ACTION_MODES, **config[CONF_ACTION_MODES]},
+            warm_up=tuple(
+                action for action in config[CONF_WARM_UP] if action in config
+            ),
+            inputs=config[CONF_INPUTS],
+            sound_modes=config[CONF_SOUND_MODES],
+            image_remotely_accessible=config.get(MEDIA_IMAGE_URL_REMOTELY_ACCESSIBLE),
+            write_coalesce=config[CONF_WRITE_COALESCE_MS] / 1000,
+            rate_limits=config[CONF_RATE_LIMITS],
+            update_intervals=config[CONF_UPDATE_INTERVALS],
+            volume_step_window=config[CONF_VOLUME_STEP_WINDOW_MS] / 1000,
+            volume_step=config[CONF_VOLUME_STEP],
+            # A local queue plays its items through play_media.
+            queue_size=config[CONF_QUEUE_SIZE] if PLAY_MEDIA_ACTION in config else 0,
+            media_library=config.get(CONF_MEDIA_LIBRARY),
+            members=tuple(config[CONF_MEMBERS]),
+            member_timeout=config[CONF_MEMBER_TIMEOUT],
+        )
+
+
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up platform."""
 
-    await async_setup_reload_service(hass, DOMAIN, PLATFORMS)
+    _async_setup_reload_service(hass)
+    async_setup_services(hass)
     async_add_entities(await _async_create_entities(hass, config))
 
 
-async def _async_create_entities(hass, config):
-    """Set up entities."""
-    media_players = []
-
-    for device, device_config in config[CONF_MEDIAPLAYER].items():
-        friendly_name = device_config.get(ATTR_FRIENDLY_NAME, device)
-        device_class = device_config.get(CONF_DEVICE_CLASS, device)
-        state_template = device_config[CONF_VALUE_TEMPLATE]
-        icon_template = device_config.get(CONF_ICON_TEMPLATE)
-        unique_id = device_config.get(CONF_UNIQUE_ID)
-        entity_picture_template = device_config.get(CONF_ENTITY_PICTURE_TEMPLATE)
-        availability_template = device_config.get(CONF_AVAILABILITY_TEMPLATE)
-        current_source_template = device_config.get(CURRENT_SOURCE_TEMPLATE)
-        on_action = device_config.get(ON_ACTION)
-        off_action = device_config.get(OFF_ACTION)
-        play_action = device_config.get(PLAY_ACTION)
-        stop_action = device_config.get(STOP_ACTION)
-        pause_action = device_config.get(PAUSE_ACTION)
-        next_action = device_config.get(NEXT_ACTION)
-        previous_action = device_config.get(PREVIOUS_ACTION)
-        volume_up_action = device_config.get(VOLUME_UP_ACTION)
-        volume_down_action = device_config.get(VOLUME_DOWN_ACTION)
-        mute_action = device_config.get(MUTE_ACTION)
-        input_templates = device_config[CONF_INPUTS]
-        title_template = device_config.get(TITLE_TEMPLATE)
-        artist_template = device_config.get(ARTIST_TEMPLATE)
-        album_template = device_config.get(ALBUM_TEMPLATE)
-        current_volume_template = device_config.get(CURRENT_VOLUME_TEMPLATE)
-        current_is_muted_template = device_config.get(CURRENT_IS_MUTED_TEMPLATE)
-        album_art_template = device_config.get(ALBUM_ART_TEMPLATE)
-        set_volume_action = device_config.get(SET_VOLUME_ACTION)
-        play_media_action = device_config.get(PLAY_MEDIA_ACTION)
-        media_content_type_template = device_config.get(MEDIA_CONTENT_TYPE_TEMPLATE)
-        media_image_url_template = device_config.get(MEDIA_IMAGE_URL_TEMPLATE)
-        media_image_url_remotely_accessible = device_config.get(MEDIA_IMAGE_URL_REMOTELY_ACCESSIBLE)
-        media_episode_template = device_config.get(MEDIA_EPISODE_TEMPLATE)
-        media_season_template = device_config.get(MEDIA_SEASON_TEMPLATE)
-        media_series_title_template = device_config.get(MEDIA_SERIES_TITLE_TEMPLATE)
-        media_album_artist_template = device_config.get(MEDIA_ALBUM_ARTIST_TEMPLATE)
-        seek_action = device_config.get(SEEK_ACTION)
-        current_position_template = device_config.get(CURRENT_POSITION_TEMPLATE)
-        media_duration_template = device_config.get(MEDIA_DURATION_TEMPLATE)
-        sound_mode_templates = device_config[CONF_SOUND_MODES]
-        current_sound_mode_template = device_config.get(CURRENT_SOUND_MODE_TEMPLATE)
-
-        media_players.append(
-            MediaPlayerTemplate(
-                hass,
-                device,
-                friendly_name,
-                device_class,
-                state_template,
-                icon_template,
-                unique_id,
-                entity_picture_template,
-                availability_template,
-                current_source_template,
-                on_action,
-                off_action,
-                play_action,
-                stop_action,
-                pause_action,
-                next_action,
-                previous_action,
-                volume_up_action,
-                volume_down_action,
-                mute_action,
-                input_templates,
-                title_template,
-                artist_template,
-                album_template,
-                current_volume_template,
-                current_is_muted_template,
-                album_art_template,
-                set_volume_action,
-                play_media_action,
-                media_content_type_template,
-                media_image_url_template,
-                media_image_url_remotely_accessible,
-                media_episode_template,
-                media_season_template,
-                media_series_title_template,
-                media_album_artist_template,
-                seek_action,
-                current_position_template,
-                media_duration_template,
-                sound_mode_templates,
-                current_sound_mode_template,
+@callback
+def _async_setup_reload_service(hass):
+    """Register a reload service that only rebuilds changed media players."""
+    if hass.services.has_service(DOMAIN, SERVICE_RELOAD):
+        return
+
+    async def _async_reload(call):
+        """Remove, add and rebuild the media players whose config changed."""
+        conf = await async_integration_yaml_config(hass, MEDIA_PLAYER_DOMAIN)
+        if conf is None:
+            return
+        configs = {}
+        for p_type, p_config in config_per_platform(conf, MEDIA_PLAYER_DOMAIN):
+            if p_type == DOMAIN:
+                for key, device_config in p_config[CONF_MEDIAPLAYER].items():
+                    configs[key] = PlayerConfig.from_config(key, device_config)
+
+        current = {
+            entity.player_key: entity for entity in hass.data.get(DATA_ENTITIES, ())
+        }
+        removed = [key for key in current if key not in configs]
+        changed = [
+            key
+            for key in current
+            if key in configs and configs[key] != current[key].player_config
+        ]
+        added = [key for key in configs if key not in current]
+
+        await asyncio.gather(
+            *(
+                current[key].platform.async_remove_entity(current[key].entity_id)
+                for key in removed + changed
             )
         )
-    return media_players
+        platform = async_get_platform_without_config_entry(
+            hass, DOMAIN, MEDIA_PLAYER_DOMAIN
+        )
+        if platform is not None and (changed or added):
+            await platform.async_add_entities(
+                [MediaPlayerTemplate(hass, configs[key]) for key in changed + added]
+            )
+
+        report = {
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            "unchanged": len(current) - len(removed) - len(changed),
+        }
+        _LOGGER.info("Reloaded template media players: %s", report)
+        hass.bus.async_fire(f"{DOMAIN}_reloaded", report, context=call.context)
+
+    async_register_admin_service(hass, DOMAIN, SERVICE_RELOAD, _async_reload)
+
+
+async def _async_create_entities(hass, config):
+    """Set up entities."""
+    return [
+        MediaPlayerTemplate(hass, PlayerConfig.from_config(device, device_config))
+        for device, device_config in config[CONF_MEDIAPLAYER].items()
+    ]
 
 
-class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity):
+class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity, RestoreEntity):
     """Representation of a Template Media player."""
 
-    def __init__(
-        self,
-        hass,
-        device_id,
-        friendly_name,
-        device_class,
-        state_template,
-        icon_template,
-        unique_id,
-        entity_picture_template,
-        availability_template,
-        current_source_template,
-        on_action,
-        off_action,
-        play_action,
-        stop_action,
-        pause_action,
-        next_action,
-        previous_action,
-        volume_up_action,
-        volume_down_action,
-        mute_action,
-        input_templates,
-        title_template,
-        artist_template,
-        album_template,
-        current_volume_template,
-        current_is_muted_template,
-        album_art_template,
-        set_volume_action,
-        play_media_action,
-        media_content_type_template,
-        media_image_url_template,
-        media_image_url_remotely_accessible,
-        media_episode_template,
-        media_season_template,
-        media_series_title_template,
-        media_album_artist_template,
-        seek_action,
-        current_position_template,
-        media_duration_template,
-        sound_mode_templates,
-        current_sound_mode_template,
-    ):
+    def __init__(self, hass, config):
         """Initialize the Template Media player."""
+        templates = config.templates
         super().__init__(
             hass,
-            availability_template=availability_template,
-            icon_template=icon_template,
-            entity_picture_template=entity_picture_template,
+            availability_template=templates.get(CONF_AVAILABILITY_TEMPLATE),
+            icon_template=templates.get(CONF_ICON_TEMPLATE),
+            entity_picture_template=templates.get(CONF_ENTITY_PICTURE_TEMPLATE),
         )
         self.hass = hass
         self.entity_id = async_generate_entity_id(
-            ENTITY_ID_FORMAT, device_id, hass=hass
+            ENTITY_ID_FORMAT, config.key, hass=hass
         )
-        self._name = friendly_name
-        self._device_class = device_class
-        self._template = state_template
+        self._config = config
+        self._templates = templates
         self._domain = __name__.split(".")[-2]
-
-        self._on_script = None
-        if on_action is not None:
-            self._on_script = Script(hass, on_action, friendly_name, self._domain)
-
-        self._off_script = None
-        if off_action is not None:
-            self._off_script = Script(hass, off_action, friendly_name, self._domain)
-
-        self._play_script = None
-        if play_action is not None:
-            self._play_script = Script(hass, play_action, friendly_name, self._domain)
-
-        self._stop_script = None
-        if stop_action is not None:
-            self._stop_script = Script(hass, stop_action, friendly_name, self._domain)
-
-        self._pause_script = None
-        if pause_action is not None:
-            self._pause_script = Script(hass, pause_action, friendly_name, self._domain)
-
-        self._next_script = None
-        if next_action is not None:
-            self._next_script = Script(hass, next_action, friendly_name, self._domain)
-
-        self._previous_script = None
-        if previous_action is not None:
-            self._previous_script = Script(
-                hass, previous_action, friendly_name, self._domain
-            )
-
-        self._volume_up_script = None
-        if volume_up_action is not None:
-            self._volume_up_script = Script(
-                hass, volume_up_action, friendly_name, self._domain
-            )
-
-        self._volume_down_script = None
-        if volume_down_action is not None:
-            self._volume_down_script = Script(
-                hass, volume_down_action, friendly_name, self._domain
-            )
-
-        self._mute_script = None
-        if mute_action is not None:
-            self._mute_script = Script(hass, mute_action, friendly_name, self._domain)
-
-        self._set_volume_script = None
-        if set_volume_action is not None:
-            self._set_volume_script = Script(
-                hass, set_volume_action, friendly_name, self._domain
+        self._action_stats = {}
+        # Scripts are built on first use, apart from the ones to warm up.
+        self._scripts = {}
+        for action in config.warm_up:
+            self._action_script(action)
+        self._attr_supported_features = (
+            MediaPlayerEntityFeature.SELECT_SOURCE
+            | MediaPlayerEntityFeature.SELECT_SOUND_MODE
+        )
+        for action in config.actions:
+            self._attr_supported_features |= ACTION_FEATURES[action]
+        if config.media_library is not None:
+            if PLAY_MEDIA_ACTION in config.actions:
+                self._attr_supported_features |= MEDIA_LIBRARY_FEATURES
+            elif not config.members:
+                _LOGGER.warning(
+                    "%s has a media library but no %s action to play it",
+                    config.key,
+                    PLAY_MEDIA_ACTION,
+                )
+        self._catalog = None
+        self._catalog_load = None
+        self._catalog_reload = None
+        self._catalog_checked = None
+        self._queue = None
+        if config.queue_size:
+            self._queue = PlayQueue(config.queue_size)
+            self._attr_supported_features |= (
+                MEDIA_ENQUEUE_FEATURE
+                | MediaPlayerEntityFeature.CLEAR_PLAYLIST
+                | MediaPlayerEntityFeature.NEXT_TRACK
+                | MediaPlayerEntityFeature.PREVIOUS_TRACK
             )
-        self._play_media_script = None
-        if play_media_action is not None:
-            self._play_media_script = Script(
-                hass, play_media_action, friendly_name, self._domain
+        # Group players add the features of their members as they show up.
+        self._base_features = self._attr_supported_features
+        self._group = None
+        if config.members:
+            self._group = MemberGroup(
+                hass, config.members, config.member_timeout, self._async_group_changed
             )
-
-        self._seek_script = None
-        if seek_action is not None:
-            self._seek_script = Script(hass, seek_action, friendly_name, self._domain)
+        self._input_scripts = {}
+        self._sound_mode_scripts = {}
+        self._source_list = list(config.inputs)
+        self._sound_mode_list = list(config.sound_modes)
 
         self._state = False
-        self._icon = None
-        self._unique_id = None
-        if unique_id is not None:
-            self._unique_id = unique_id
-        self._entity_picture = None
-        self._available = True
-        self._input_templates = input_templates
-        self._current_source_template = current_source_template
+        self._player_state = MediaPlayerState.OFF
         self._current_source = None
-        self._source_list = list(input_templates.keys())
-        self._attributes = {}
-        self._title_template = title_template
-        self._artist_template = artist_template
-        self._album_template = album_template
-        self._current_volume_template = current_volume_template
-        self._current_is_muted_template = current_is_muted_template
-        self._album_art_template = album_art_template
-        self._media_content_type_template = media_content_type_template
-        self._media_image_url_template = media_image_url_template
-        self._media_image_url_remotely_accessible = media_image_url_remotely_accessible
-        self._media_episode_template = media_episode_template
-        self._media_season_template = media_season_template
-        self._media_series_title_template = media_series_title_template
-        self._media_album_artist_template = media_album_artist_template
-        self._media_content_type_template = media_content_type_template
-        self._current_position_template = current_position_template
-        self._media_duration_template = media_duration_template
-
-        self._sound_mode_templates = sound_mode_templates
-        self._current_sound_mode_template = current_sound_mode_template
         self._sound_mode = None
-        self._sound_mode_list = list(sound_mode_templates.keys())
-
         self._track_name = None
         self._track_artist = None
         self._track_album_name = None
@@ -402,85 +642,389 @@ class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity):
         self._media_series_title = None
         self._media_album_artist = None
         self._media_content_type = None
-        self._current_position = None
+        self._position = MediaPosition()
         self._media_duration = None
-        self._last_update = None
+        self._template_update = False
+        self._pending_write = None
+        self._writes = 0
+        self._writes_coalesced = 0
+        self._last_written = None
+        self._writes_suppressed = 0
+        self._volume_steps = 0
+        # Last volume sent, volume steps add to it until a new one is reported.
+        self._volume_target = None
+        self._volume_step_timer = None
+        self._volume_step_task = None
+        self._profiler = hass.data.get(DATA_PROFILER)
+        self._tracker = TemplateTracker(
+            hass, self._handle_tracker_results, self._profiler
+        )
+        self._tracked_attributes = {}
+        self._invalid_results = {}
 
     async def async_added_to_hass(self):
         """Register callbacks."""
-        self.add_template_attribute("_state", self._template, None, self._update_state)
-
-        if self._current_source_template is not None:
-            self.add_template_attribute(
-                "_current_source", self._current_source_template
+        variables = {"this": TemplateStateFromEntityId(self.hass, self.entity_id)}
+        for key, attribute, on_update in TEMPLATE_ATTRIBUTES:
+            template = self._templates.get(key)
+            if template is None:
+                continue
+            template.hass = self.hass
+            self._tracked_attributes[key] = (
+                attribute,
+                getattr(self, on_update) if on_update is not None else None,
+                TEMPLATE_PARSERS.get(key),
+            )
+            self._tracker.add(
+                key,
+                template,
+                variables,
+                rate_limit=self._config.rate_limits.get(key),
+                update_interval=self._config.update_intervals.get(key),
+                # Metadata is only tracked while the player is on and available.
+                enabled=key not in METADATA_TEMPLATES,
             )
 
-        if self._title_template is not None:
-            self.add_template_attribute("_track_name", self._title_template)
+        entities = self.hass.data.setdefault(DATA_ENTITIES, set())
+        entities.add(self)
+        self.async_on_remove(lambda: entities.discard(self))
+        self.async_on_remove(self._async_cancel_pending_write)
+        self.async_on_remove(self._tracker.async_stop)
+        self.async_on_remove(self._async_cancel_volume_steps)
+        await self._async_restore()
+        startup = async_get_startup_queue(self.hass)
+        startup.async_add(self, self._async_template_startup)
+        self.async_on_remove(lambda: startup.async_remove(self))
+        # All templates are in our own tracker, skip the one TemplateEntity
+        # would set up for them.
+        await super(TemplateEntity, self).async_added_to_hass()
 
-        if self._artist_template is not None:
-            self.add_template_attribute("_track_artist", self._artist_template)
+    @callback
+    def _async_template_startup(self):
+        """Start tracking templates once Home Assistant is running."""
+        self._tracker.async_start(self.entity_id)
+        if self._group is not None:
+            self.async_on_remove(self._group.async_start(self.entity_id))
+            self._async_group_changed(None)
+
+    async def _async_restore(self):
+        """Show the last known state until the templates have rendered."""
+        data = await self.async_get_last_extra_data()
+        if data is None:
+            return
+        restored = data.as_dict()
+        for attribute in RESTORED_ATTRIBUTES:
+            value = restored.get(attribute[1:])
+            parse = RESTORE_PARSERS.get(attribute)
+            if parse is not None:
+                try:
+                    value = parse(value)
+                except (TypeError, ValueError):
+                    value = None
+            setattr(self, attribute, value)
+        self._set_state(self._state)
+        # The position is frozen where it was, playback time while Home
+        # Assistant was down is unknown. A playing state moves it on from now.
+        position = restored.get("position")
+        if isinstance(position, (int, float)):
+            self._position.position = position
+            self._position.updated_at = dt_util.utcnow()
+        self._position.duration = self._media_duration
+        # Metadata is rendered on start if the player was on.
+        self._async_update_metadata_tracking()
 
-        if self._album_template is not None:
-            self.add_template_attribute("_track_album_name", self._album_template)
+    @property
+    def extra_restore_state_data(self):
+        """Return the values to restore on the next start."""
+        data = {
+            attribute[1:]: getattr(self, attribute) for attribute in RESTORED_ATTRIBUTES
+        }
+        data["position"] = self._position.position
+        return RestoredExtraData(data)
 
-        if self._current_volume_template is not None:
-            self.add_template_attribute("_volume", self._current_volume_template)
+    @property
+    def player_key(self):
+        """Return the config key of the player."""
+        return self._config.key
 
-        if self._current_is_muted_template is not None:
-            self.add_template_attribute("_is_muted", self._current_is_muted_template)
+    @property
+    def player_config(self):
+        """Return the config the player was built from."""
+        return self._config
 
-        if self._album_art_template is not None:
-            self.add_template_attribute("_album_art", self._album_art_template)
-        if self._media_content_type_template is not None:
-            self.add_template_attribute(
-                "_media_content_type", self._media_content_type_template
-            )
-        if self._media_image_url_template is not None:
-            self.add_template_attribute(
-                "_media_image_url", self._media_image_url_template
-            )
-        if self._media_episode_template is not None:
-            self.add_template_attribute("_media_episode", self._media_episode_template)
-        if self._media_season_template is not None:
-            self.add_template_attribute("_media_season", self._media_season_template)
-        if self._media_series_title_template is not None:
-            self.add_template_attribute(
-                "_media_series_title", self._media_series_title_template
-            )
-        if self._media_album_artist_template is not None:
-            self.add_template_attribute(
-                "_media_album_artist", self._media_album_artist_template
-            )
-        if self._current_position_template is not None:
-            self.add_template_attribute(
-                "_current_position", self._current_position_template
-            )
-        if self._media_duration_template is not None:
-            self.add_template_attribute(
-                "_media_duration", self._media_duration_template
-            )
-        if self._current_sound_mode_template is not None:
-            self.add_template_attribute(
-                "_sound_mode", self._current_sound_mode_template
-            )
+    @property
+    def render_counts(self):
+        """Return the number of renders per template."""
+        return self._tracker.render_counts
+
+    def stats(self):
+        """Return template, action and state write statistics."""
+        templates = self._tracker.stats()
+        for key, stats in templates.items():
+            stats["invalid"] = self._invalid_results.get(key, 0)
+        stats = {
+            "templates": templates,
+            "actions": {
+                action: stats.as_dict() for action, stats in self._action_stats.items()
+            },
+            "writes": {
+                "written": self._writes,
+                "coalesced": self._writes_coalesced,
+                "suppressed": self._writes_suppressed,
+            },
+        }
+        if self._group is not None:
+            stats["members"] = self._group.stats()
+        return stats
+
+    @property
+    def writes_coalesced(self):
+        """Return the number of state writes merged into a later write."""
+        return self._writes_coalesced
+
+    @property
+    def writes_suppressed(self):
+        """Return the number of state writes skipped because nothing changed."""
+        return self._writes_suppressed
 
-        await super().async_added_to_hass()
+    @callback
+    def _state_snapshot(self):
+        """Return the values that make up the written state and attributes."""
+        return (
+            self._state,
+            self._attr_available,
+            self._attr_icon,
+            self._attr_entity_picture,
+            self._current_source,
+            self._sound_mode,
+            self._volume,
+            self._is_muted,
+            self._track_name,
+            self._track_artist,
+            self._track_album_name,
+            self._media_image_url,
+            self._media_episode,
+            self._media_season,
+            self._media_series_title,
+            self._media_album_artist,
+            self._media_content_type,
+            self._position.position,
+            self._position.updated_at,
+            self._media_duration,
+            self._queue.version if self._queue is not None else None,
+            self._attr_supported_features,
+        )
+
+    @callback
+    @profiled
+    def async_write_ha_state(self):
+        """Write the state, merging template updates within the coalesce window."""
+        if self._template_update:
+            if not self._config.write_coalesce:
+                self._async_write_state()
+            elif self._pending_write is None:
+                self._pending_write = async_call_later(
+                    self.hass, self._config.write_coalesce, self._async_flush_write
+                )
+            else:
+                self._writes_coalesced += 1
+            return
+        # Writes requested by Home Assistant itself always go out.
+        self._async_take_pending_write()
+        self._last_written = self._state_snapshot()
+        self._writes += 1
+        super().async_write_ha_state()
+
+    @callback
+    def _async_write_state(self):
+        """Write the state unless nothing visible changed since the last write."""
+        self._async_take_pending_write()
+        snapshot = self._state_snapshot()
+        if snapshot == self._last_written:
+            self._writes_suppressed += 1
+            return
+        self._last_written = snapshot
+        self._writes += 1
+        super().async_write_ha_state()
+
+    @callback
+    @profiled
+    def _async_flush_write(self, _now):
+        """Write the template results collected during the coalesce window."""
+        self._pending_write = None
+        self._async_write_state()
+
+    @callback
+    def _async_take_pending_write(self):
+        """Fold a scheduled coalesced write into the write happening now."""
+        if self._pending_write is not None:
+            self._async_cancel_pending_write()
+            self._writes_coalesced += 1
+
+    @callback
+    def _async_cancel_pending_write(self):
+        """Drop a scheduled coalesced write."""
+        if self._pending_write is not None:
+            self._pending_write()
+            self._pending_write = None
 
     @callback
     def _update_state(self, result):
         super()._update_state(result)
-        self._state = None if isinstance(result, TemplateError) else result
+        self._set_state(None if isinstance(result, TemplateError) else result)
+        self._position.set_rate(
+            1.0 if self._player_state == MediaPlayerState.PLAYING else 0.0,
+            dt_util.utcnow(),
+        )
+        self._async_update_metadata_tracking()
+
+    @callback
+    def _set_state(self, state):
+        """Store a parsed state and the player state it stands for."""
+        self._state = state
+        if state is None:
+            self._player_state = None
+        else:
+            self._player_state = PLAYER_STATES.get(state, MediaPlayerState.OFF)
+
+    @callback
+    def _update_available(self, result):
+        super()._update_available(result)
+        self._async_update_metadata_tracking()
+
+    @callback
+    def _update_icon(self, result):
+        """Store a rendered icon if it is a valid icon."""
+        if isinstance(result, TemplateError):
+            self._attr_icon = None
+            return
+        try:
+            self._attr_icon = ICON_VALIDATOR(result)
+        except vol.Invalid as ex:
+            _LOGGER.error(
+                "Error validating icon '%s' for entity %s: %s",
+                result,
+                self.entity_id,
+                ex,
+            )
+            self._attr_icon = None
+
+    @callback
+    def _update_volume(self, result):
+        """Store a parsed volume."""
+        self._set_reported_volume(None if isinstance(result, TemplateError) else result)
+
+    @callback
+    def _set_reported_volume(self, volume):
+        """Store the volume the device reports, ending a pending step target."""
+        if volume != self._volume:
+            self._volume_target = None
+        self._volume = volume
+
+    @callback
+    def _update_duration(self, result):
+        """Store a parsed duration, the position does not run past it."""
+        duration = None if isinstance(result, TemplateError) else result
+        self._media_duration = self._position.duration = duration
+
+    @callback
+    def _update_position(self, result):
+        """Feed a parsed position into the position model."""
+        position = None if isinstance(result, TemplateError) else result
+        self._position.set_position(position, dt_util.utcnow())
+
+    @callback
+    def _async_update_metadata_tracking(self):
+        """Track metadata templates only while the player is on and available."""
+        self._tracker.async_set_enabled(
+            METADATA_TEMPLATES,
+            self._attr_available and self.state != MediaPlayerState.OFF,
+        )
+
+    @callback
+    @profiled
+    def _handle_tracker_results(self, event, updates):
+        """Hand tracked template results to their attributes."""
+        if event:
+            self.async_set_context(event.context)
+        # Enabling metadata from a state or availability update delivers more
+        # results from within this call, the outer call writes them all.
+        nested = self._template_update
+        self._template_update = True
+        try:
+            for key, result in updates:
+                # The tracker logs TemplateErrors.
+                attribute, on_update, parse = self._tracked_attributes[key]
+                if parse is not None and not isinstance(result, TemplateError):
+                    try:
+                        result = parse(result)
+                    except (TypeError, ValueError) as ex:
+                        # Cleared, keeping the last valid value would go stale.
+                        self._async_invalid_result(key, ex)
+                        result = None
+                if on_update is not None:
+                    on_update(result)
+                else:
+                    setattr(
+                        self,
+                        attribute,
+                        None if isinstance(result, TemplateError) else result,
+                    )
+            if not nested:
+                self.async_write_ha_state()
+        finally:
+            self._template_update = nested
+
+    @callback
+    def _async_group_changed(self, event):
+        """Take the member aggregates that no template overrides."""
+        if event is not None:
+            self.async_set_context(event.context)
+        group = self._group
+        # Written like template results, within the coalesce window. Within a
+        # tracker callback the outer call writes.
+        nested = self._template_update
+        self._template_update = True
+        try:
+            if CONF_VALUE_TEMPLATE not in self._templates:
+                self._set_state(group.state)
+                self._async_update_metadata_tracking()
+            if CURRENT_VOLUME_TEMPLATE not in self._templates:
+                self._set_reported_volume(group.volume_level)
+            if CURRENT_IS_MUTED_TEMPLATE not in self._templates:
+                self._is_muted = group.is_volume_muted
+            features = group.supported_features & MEMBER_FEATURES
+            # Library items are played through the members.
+            if (
+                self._config.media_library is not None
+                and features & MediaPlayerEntityFeature.PLAY_MEDIA
+            ):
+                features |= MEDIA_LIBRARY_FEATURES
+            self._attr_supported_features = self._base_features | features
+            if not nested:
+                self.async_write_ha_state()
+        finally:
+            self._template_update = nested
+
+    @callback
+    def _async_invalid_result(self, key, error):
+        """Count a rejected result."""
+        count = self._invalid_results[key] = self._invalid_results.get(key, 0) + 1
+        # Counted in dump_stats, only the first one is worth a warning.
+        if count == 1:
+            _LOGGER.warning(
+                "Ignoring %s of entity '%s': %s", key, self.entity_id, error
+            )
 
     @property
     def name(self):
         """Return the name of the media player."""
-        return self._name
+        return self._config.name
 
     @property
     def device_class(self):
         """Return the class of this device."""
-        return self._device_class
+        return self._config.device_class
 
     @property
     def is_on(self):
@@ -495,144 +1039,324 @@ class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity):
     @property
     def icon(self):
         """Return the icon to use in the frontend, if any."""
-        return self._icon
-
-    @property
-    def supported_features(self):
-        """Flag media player features that are supported."""
-
-        support = 0
-        if self._on_script is not None:
-            support |= MediaPlayerEntityFeature.TURN_ON
-        if self._off_script is not None:
-            support |= MediaPlayerEntityFeature.TURN_OFF
-        if self._play_script is not None:
-            support |= MediaPlayerEntityFeature.PLAY
-        if self._stop_script is not None:
-            support |= MediaPlayerEntityFeature.STOP
-        if self._pause_script is not None:
-            support |= MediaPlayerEntityFeature.PAUSE
-        if self._next_script is not None:
-            support |= MediaPlayerEntityFeature.NEXT_TRACK
-        if self._previous_script is not None:
-            support |= MediaPlayerEntityFeature.PREVIOUS_TRACK
-        if self._volume_up_script is not None or self._volume_down_script is not None:
-            support |= MediaPlayerEntityFeature.VOLUME_STEP
-        if self._mute_script is not None:
-            support |= MediaPlayerEntityFeature.VOLUME_MUTE
-        if self._source_list is not None:
-            support |= MediaPlayerEntityFeature.SELECT_SOURCE
-        if self._set_volume_script is not None:
-            support |= MediaPlayerEntityFeature.VOLUME_SET
-        if self._play_media_script is not None:
-            support |= MediaPlayerEntityFeature.PLAY_MEDIA
-        if self._seek_script is not None:
-            support |= MediaPlayerEntityFeature.SEEK
-        if self._sound_mode_list is not None:
-            support |= MediaPlayerEntityFeature.SELECT_SOUND_MODE
-        return support
-
-    @property
-    def available(self) -> bool:
-        """Return if the device is available."""
-        return self._available
+        return self._attr_icon
 
     @property
     def media_position_updated_at(self):
         """When was the position of the current playing media valid.
         Returns value from homeassistant.util.dt.utcnow().
         """
-        return self._last_update
+        return self._position.updated_at
+
+    @async_profiled
+    async def _async_run_action(self, action, variables=None, script=None):
+        """Run an action script, recording its run time and how concurrent
+        calls are handled. Group players without the script send the action
+        to their members."""
+        if script is None:
+            if action not in self._config.actions and self._group is not None:
+                await self._async_call_members(action, variables or {})
+                return
+            script = self._action_script(action)
+        stats = self._action_stats.get(action)
+        if stats is None:
+            stats = self._action_stats[action] = ActionStats(script)
+        stats.calls += 1
+        if script.is_running:
+            mode = script.script_mode
+            if mode == SCRIPT_MODE_RESTART:
+                stats.cancelled += 1
+            elif mode == SCRIPT_MODE_SINGLE or script.runs >= script.max_runs:
+                stats.dropped += 1
+            elif mode == SCRIPT_MODE_QUEUED:
+                stats.queued += 1
+                stats.max_queue_depth = max(stats.max_queue_depth, script.runs)
+        start = time.perf_counter()
+        try:
+            await script.async_run(variables, context=self._context)
+        finally:
+            stats.run_time.record(time.perf_counter() - start)
+
+    async def _async_call_members(self, action, variables):
+        """Send an action to the members as a media player service call."""
+        service, features, fields = MEMBER_SERVICES[action]
+        data = {
+            field: variables[name]
+            for field, name in fields.items()
+            if variables.get(name) is not None
+        }
+        await self._group.async_call(
+            service, features, data, self._context, variables.get("steps", 1)
+        )
+
+    def _has_action(self, action):
+        """Return True if the player has a script or members for action."""
+        if action in self._config.actions:
+            return True
+        return (
+            self._group is not None
+            and self._group.supported_features & MEMBER_SERVICES[action][1] != 0
+        )
 
     async def async_turn_on(self):
         """Fire the on action."""
-        await self._on_script.async_run(context=self._context)
+        await self._async_run_action(ON_ACTION)
 
     async def async_turn_off(self):
         """Fire the off action."""
-        await self._off_script.async_run(context=self._context)
+        await self._async_run_action(OFF_ACTION)
 
     async def async_volume_up(self):
         """Fire the volume up action."""
-        await self._volume_up_script.async_run(context=self._context)
+        if self._config.volume_step_window:
+            self._async_add_volume_steps(1)
+            return
+        await self._async_run_action(VOLUME_UP_ACTION, {"steps": 1})
 
     async def async_volume_down(self):
         """Fire the volume down action."""
-        await self._volume_down_script.async_run(context=self._context)
+        if self._config.volume_step_window:
+            self._async_add_volume_steps(-1)
+            return
+        await self._async_run_action(VOLUME_DOWN_ACTION, {"steps": 1})
+
+    @callback
+    def _async_add_volume_steps(self, steps):
+        """Collect volume steps and send their sum once the window closes."""
+        self._volume_steps += steps
+        if self._volume_step_timer is None and self._volume_step_task is None:
+            self._volume_step_timer = async_call_later(
+                self.hass,
+                self._config.volume_step_window,
+                self._async_flush_volume_steps,
+            )
+
+    @callback
+    def _async_flush_volume_steps(self, _now):
+        """Send the collected volume steps as a single command."""
+        self._volume_step_timer = None
+        steps, self._volume_steps = self._volume_steps, 0
+        if steps:
+            self._volume_step_task = self.hass.async_create_task(
+                self._async_send_volume_steps(steps)
+            )
+
+    async def _async_send_volume_steps(self, steps):
+        """Apply a net number of volume steps.
+
+        Uses set_volume when the current volume is known, otherwise runs the
+        volume up or down action once with a steps variable. Steps collected
+        while this runs are sent right after it, on top of the volume sent
+        last as long as the device has not reported a new one.
+        """
+        try:
+            base = self._volume_target
+            if base is None:
+                base = self._volume
+            if self._has_action(SET_VOLUME_ACTION) and base is not None:
+                volume = base + steps * self._config.volume_step
+                await self.async_set_volume_level(round(min(1.0, max(0.0, volume)), 4))
+            else:
+                action = VOLUME_UP_ACTION if steps > 0 else VOLUME_DOWN_ACTION
+                if self._has_action(action):
+                    await self._async_run_action(action, {"steps": abs(steps)})
+        finally:
+            self._volume_step_task = None
+            if self._volume_steps and self.hass is not None:
+                self._async_flush_volume_steps(None)
+
+    @callback
+    def _async_cancel_volume_steps(self):
+        """Drop collected volume steps and stop sending them."""
+        if self._volume_step_timer is not None:
+            self._volume_step_timer()
+            self._volume_step_timer = None
+        if self._volume_step_task is not None:
+            self._volume_step_task.cancel()
+            self._volume_step_task = None
+        self._volume_steps = 0
+        self._volume_target = None
 
     async def async_mute_volume(self, mute):
         """Set the is_muted state."""
-        if self._current_is_muted_template is None:
+        if CURRENT_IS_MUTED_TEMPLATE not in self._templates:
             self._is_muted = mute
-            self.async_write_ha_state()
-        await self._mute_script.async_run({"is_muted": mute}, context=self._context)
+            self._async_write_state()
+        await self._async_run_action(MUTE_ACTION, {"is_muted": mute})
 
     async def async_media_play(self):
         """Fire the play action."""
-        await self._play_script.async_run(context=self._context)
+        await self._async_run_action(PLAY_ACTION)
 
     async def async_media_stop(self):
         """Fire the stop action."""
-        await self._stop_script.async_run(context=self._context)
+        await self._async_run_action(STOP_ACTION)
 
     async def async_media_pause(self):
         """Fire the pause action."""
-        await self._pause_script.async_run(context=self._context)
+        await self._async_run_action(PAUSE_ACTION)
 
     async def async_media_next_track(self):
-        """Fire the media next action."""
-        await self._next_script.async_run(context=self._context)
+        """Play the next queued item, or fire the media next action."""
+        if self._queue is not None:
+            item = self._queue.next()
+            if item is not None:
+                self._async_write_state()
+                await self._async_play_item(*item)
+                return
+        if self._has_action(NEXT_ACTION):
+            await self._async_run_action(NEXT_ACTION)
 
     async def async_media_previous_track(self):
-        """Fire the media previous action."""
-        await self._previous_script.async_run(context=self._context)
+        """Play the previous queued item, or fire the media previous action."""
+        if self._queue is not None:
+            item = self._queue.previous()
+            if item is not None:
+                self._async_write_state()
+                await self._async_play_item(*item)
+                return
+        if self._has_action(PREVIOUS_ACTION):
+            await self._async_run_action(PREVIOUS_ACTION)
 
     async def async_set_volume_level(self, volume):
         """Set the volume."""
-        if self._current_volume_template is None:
+        self._volume_target = volume
+        if CURRENT_VOLUME_TEMPLATE not in self._templates:
             self._volume = volume
-            self.async_write_ha_state()
-        await self._set_volume_script.async_run(
-            {"volume": volume}, context=self._context
-        )
+            self._async_write_state()
+        await self._async_run_action(SET_VOLUME_ACTION, {"volume": volume})
 
     async def async_play_media(self, media_type, media_id, **kwargs):
-        """play media"""
-        await self._play_media_script.async_run(
-            {"media_type": media_type, "media_id": media_id}, context=self._context
+        """Play media, through the local queue if the player keeps one."""
+        enqueue = kwargs.get(ATTR_MEDIA_ENQUEUE)
+        if self._queue is None:
+            await self._async_play_item(media_type, media_id, enqueue)
+            return
+        item = self._queue.enqueue((media_type, media_id), enqueue)
+        self._async_write_state()
+        if item is not None:
+            await self._async_play_item(*item)
+
+    async def async_browse_media(self, media_content_type=None, media_content_id=None):
+        """Browse the media library, items are played through play_media."""
+        catalog = await self._async_get_catalog()
+        return catalog.browse(media_content_id)
+
+    @property
+    def has_media_library(self):
+        """Return True if the player has a media library it can play from."""
+        return bool(
+            self._attr_supported_features & MediaPlayerEntityFeature.BROWSE_MEDIA
+        )
+
+    async def async_search_media(self, query):
+        """Search the media library."""
+        return SearchMedia(
+            result=await self.async_search_catalog(
+                query.search_query, media_classes=query.media_filter_classes
+            )
         )
 
+    async def async_search_catalog(self, query, limit=SEARCH_LIMIT, media_classes=None):
+        """Return the media library entries matching query, best first."""
+        catalog = await self._async_get_catalog()
+        if len(catalog) <= SEARCH_INLINE_NODES:
+            return catalog.search(query, limit, media_classes)
+        return await self.hass.async_add_executor_job(
+            catalog.search, query, limit, media_classes
+        )
+
+    async def _async_get_catalog(self):
+        """Return the media library, loading it in the executor on first use."""
+        if self._catalog is not None:
+            self._async_check_catalog()
+            return self._catalog
+        if self._catalog_load is None:
+            self._catalog_load = self.hass.async_add_executor_job(
+                load_catalog, self._config.media_library, self.hass.config.config_dir
+            )
+        load = self._catalog_load
+        try:
+            catalog = await load
+        except (HomeAssistantError, OSError, TypeError, ValueError) as ex:
+            # Try again on the next call, the file may have been fixed.
+            raise BrowseError(f"Could not load media library: {ex}") from ex
+        finally:
+            if self._catalog_load is load:
+                self._catalog_load = None
+        self._catalog = catalog
+        self._catalog_checked = self.hass.loop.time()
+        return catalog
+
+    @callback
+    def _async_check_catalog(self):
+        """Reload a media library file in the background once it changed.
+
+        Calls keep using the loaded catalog until the new one is ready.
+        """
+        now = self.hass.loop.time()
+        if (
+            not isinstance(self._config.media_library, str)
+            or self._catalog_reload is not None
+            or now - self._catalog_checked < CATALOG_CHECK_INTERVAL
+        ):
+            return
+        self._catalog_checked = now
+        self._catalog_reload = self.hass.async_create_task(self._async_reload_catalog())
+
+    async def _async_reload_catalog(self):
+        """Swap in the media library file if it changed."""
+        try:
+            catalog = await self.hass.async_add_executor_job(
+                reload_catalog,
+                self._catalog,
+                self._config.media_library,
+                self.hass.config.config_dir,
+            )
+        except (HomeAssistantError, OSError, TypeError, ValueError) as ex:
+            _LOGGER.error(
+                "Could not reload media library of %s, keeping the loaded one: %s",
+                self.entity_id,
+                ex,
+            )
+            return
+        finally:
+            self._catalog_reload = None
+        if catalog is not None:
+            self._catalog = catalog
+
+    async def async_clear_playlist(self):
+        """Clear the local play queue."""
+        self._queue.clear()
+        self._async_write_state()
+
+    async def _async_play_item(self, media_type, media_id, enqueue=None):
+        """Run the play media action for one item."""
+        await self._async_run_action(
+            PLAY_MEDIA_ACTION,
+            {"media_type": media_type, "media_id": media_id, "enqueue": enqueue},
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Return the local play queue, if the player keeps one."""
+        if self._queue is None:
+            return None
+        return self._queue.as_attributes()
+
     async def async_media_seek(self, position):
         """Send seek command."""
-        await self._seek_script.async_run({"position": position}, context=self._context)
+        await self._async_run_action(SEEK_ACTION, {"position": position})
 
     @property
     def state(self):
         """Return the state of the player."""
-        if self._state is None:
-            return None
-        elif self._state == "playing":
-            return MediaPlayerState.PLAYING
-        elif self._state == "paused":
-            return MediaPlayerState.PAUSED
-        elif self._state == "idle":
-            return MediaPlayerState.IDLE
-        elif self._state == "on":
-            return MediaPlayerState.ON
-        elif self._state == "off":
-            return MediaPlayerState.OFF
-        return MediaPlayerState.OFF
+        return self._player_state
 
     @property
     def source(self):
         """Return the current input source."""
-        try:
-            if self._current_source_template is not None:
-                self._current_source = self._current_source_template.async_render()
-            return self._current_source
-        except TemplateError as ex:
-            _LOGGER.error(ex)
-            return None
+        return self._current_source
 
     @property
     def source_list(self):
@@ -642,7 +1366,7 @@ class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity):
     @property
     def unique_id(self):
         """Unique id."""
-        return self._unique_id
+        return self._config.unique_id
 
     @property
     def volume_level(self):
@@ -702,130 +1426,99 @@ class MediaPlayerTemplate(TemplateEntity, MediaPlayerEntity):
     @property
     def media_image_remotely_accessible(self) -> bool:
         """If the image url is remotely accessible."""
-        return self._media_image_url_remotely_accessible
+        return self._config.image_remotely_accessible
 
     @property
     def media_position(self):
         """Position of current playing media in seconds."""
-        if self._state == "playing" or self._state == "paused":
-            self._last_update = dt_util.utcnow()
-            return self._current_position
+        if self._player_state in _MEDIA_STATES:
+            return self._position.position
         return None
 
     @property
     def media_duration(self):
-        if self._state == "playing" or self._state == "paused":
+        if self._player_state in _MEDIA_STATES:
             return self._media_duration
         return None
 
     @property
     def sound_mode(self):
-        """Return the current input source."""
-        try:
-            if self._current_sound_mode_template is not None:
-                self._sound_mode = self._current_sound_mode_template.async_render()
-            return self._sound_mode
-        except TemplateError as ex:
-            _LOGGER.error(ex)
-            return None
+        """Return the current sound mode."""
+        return self._sound_mode
 
     @property
     def sound_mode_list(self):
         """Return a list of available sound modes."""
         return self._sound_mode_list
 
+    def _action_script(self, action):
+        """Return the script of action, building it on first use."""
+        script = self._scripts.get(action)
+        if script is None:
+            mode = self._config.action_modes.get(action, {})
+            script = self._scripts[action] = Script(
+                self.hass,
+                self._config.actions[action],
+                self._config.name,
+                self._domain,
+                script_mode=mode.get(CONF_MODE, DEFAULT_SCRIPT_MODE),
+                max_runs=mode.get(CONF_MAX, DEFAULT_MAX),
+            )
+        return script
+
+    def _cached_script(self, scripts, sequences, key):
+        """Return the script for key, building it on first use."""
+        script = scripts.get(key)
+        if script is None:
+            script = scripts[key] = Script(
+                self.hass,
+                sequences[key],
+                self._config.name,
+                self._domain,
+                script_mode=SCRIPT_MODE_PARALLEL,
+            )
+        return script
+
     async def async_select_source(self, source):
         """Set the input source."""
-        if source in self._input_templates:
-            source_script = Script(
-                self.hass, self._input_templates[source], self._name, self._domain
+        if source in self._config.inputs:
+            source_script = self._cached_script(
+                self._input_scripts, self._config.inputs, source
             )
-            if self._current_source_template is None:
+            if CURRENT_SOURCE_TEMPLATE not in self._templates:
                 self._current_source = source
-                self.async_write_ha_state()
-            await source_script.async_run(context=self._context)
+                self._async_write_state()
+            await self._async_run_action(
+                f"{SELECT_SOURCE_ACTION}.{source}", script=source_script
+            )
+        elif self._group is not None:
+            await self._group.async_call(
+                SERVICE_SELECT_SOURCE,
+                MediaPlayerEntityFeature.SELECT_SOURCE,
+                {ATTR_INPUT_SOURCE: source},
+                self._context,
+            )
 
     async def async_select_sound_mode(self, sound_mode):
         """Select sound mode."""
-        if sound_mode in self._sound_mode_templates:
-            sound_mode_script = Script(
-                self.hass,
-                self._sound_mode_templates[sound_mode],
-                self._name,
-                self._domain,
+        if sound_mode in self._config.sound_modes:
+            sound_mode_script = self._cached_script(
+                self._sound_mode_scripts, self._config.sound_modes, sound_mode
             )
-            if self._current_sound_mode_template is None:
+            if CURRENT_SOUND_MODE_TEMPLATE not in self._templates:
                 self._sound_mode = sound_mode
-                self.async_write_ha_state()
-            await sound_mode_script.async_run(context=self._context)
+                self._async_write_state()
+            await self._async_run_action(
+                f"{SELECT_SOUND_MODE_ACTION}.{sound_mode}", script=sound_mode_script
+            )
+        elif self._group is not None:
+            await self._group.async_call(
+                SERVICE_SELECT_SOUND_MODE,
+                MediaPlayerEntityFeature.SELECT_SOUND_MODE,
+                {ATTR_SOUND_MODE: sound_mode},
+                self._context,
+            )
 
     async def async_update(self):
-        """Update the state from the template."""
-
-        try:
-            state = self._template.async_render().lower()
-
-            if state in _VALID_STATES:
-                self._state = state
-            elif state == STATE_UNKNOWN:
-                self._state = None
-            else:
-                _LOGGER.error(
-                    "Received invalid media_player state: %s. Expected: %s.",
-                    state,
-                    ", ".join(_VALID_STATES),
-                )
-                self._state = None
-
-        except TemplateError as ex:
-            _LOGGER.error(ex)
-            self._state = None
-
-        for property_name, template in (
-            ("_icon", self._icon_template),
-            ("_entity_picture", self._entity_picture_template),
-            ("_available", self._availability_template),
-            ("_volume", self._current_volume_template),
-            ("_is_muted", self._current_is_muted_template),
-            ("_track_name", self._title_template),
-            ("_track_artist", self._artist_template),
-            ("_track_album_name", self._album_template),
-            ("_album_art", self._album_art_template),
-            ("_current_positon", self._current_position),
-            ("_media_duration", self._media_duration),
-        ):
-            if template is None:
-                continue
-
-            try:
-                value = template.async_render()
-                if property_name == "_available":
-                    value = value.lower() == "true"
-                if (
-                    property_name == "_current_positon"
-                    and value != self._current_position
-                ):
-                    self._last_update = dt_util.utcnow()
-                setattr(self, property_name, value)
-            except TemplateError as ex:
-                friendly_property_name = property_name[1:].replace("_", " ")
-                if ex.args and ex.args[0].startswith(
-                    "UndefinedError: 'None' has no attribute"
-                ):
-                    # Common during HA startup - so just a warning
-                    _LOGGER.warning(
-                        "Could not render %s template %s, the state is unknown.",
-                        friendly_property_name,
-                        self._name,
-                    )
-                    return
-
-                try:
-                    setattr(self, property_name, getattr(super(), property_name))
-                except AttributeError:
-                    _LOGGER.error(
-                        "Could not render %s template %s: %s",
-                        friendly_property_name,
-                        self._name,
-                        ex,
-                    )
+        """Render all templates now."""
+        self._tracker.async_refresh()
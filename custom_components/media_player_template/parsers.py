@@ -0,0 +1,77 @@
+"""Parsers turning rendered template results into typed values.
+
+Each parser returns the typed value, None for results that stand for an
+unknown value, and raises ValueError or TypeError for invalid results.
+"""
+import math
+
+from homeassistant.components.media_player import MediaPlayerState
+
+# Rendered states and the player state they stand for, every state Home
+# Assistant knows.
+PLAYER_STATES = {state.value: state for state in MediaPlayerState}
+
+# Other spellings of the on and off states.
+_STATE_ALIASES = {"true": "on", "false": "off"}
+
+_TRUE = frozenset({"true", "on", "yes", "1"})
+_FALSE = frozenset({"false", "off", "no", "0"})
+
+# Results that stand for an unknown value.
+_UNKNOWN = frozenset({"", "none", "unknown", "unavailable"})
+
+
+def _text(result):
+    """Return result as lowercase text, None if it is unknown."""
+    if result is None:
+        return None
+    text = str(result).strip().lower()
+    return None if text in _UNKNOWN else text
+
+
+def parse_state(result):
+    """Return a key of PLAYER_STATES."""
+    if isinstance(result, bool):
+        return "on" if result else "off"
+    text = _text(result)
+    if text is None:
+        return None
+    text = _STATE_ALIASES.get(text, text)
+    if text not in PLAYER_STATES:
+        raise ValueError(f"invalid state {result!r}")
+    return text
+
+
+def parse_float(result):
+    """Return a finite float."""
+    if isinstance(result, bool):
+        raise TypeError(f"invalid number {result!r}")
+    if isinstance(result, str):
+        if _text(result) is None:
+            return None
+    elif result is None:
+        return None
+    value = float(result)
+    if not math.isfinite(value):
+        raise ValueError(f"invalid number {result!r}")
+    return value
+
+
+def parse_volume(result):
+    """Return a float clamped to 0..1."""
+    value = parse_float(result)
+    return None if value is None else min(1.0, max(0.0, value))
+
+
+def parse_bool(result):
+    """Return a bool."""
+    if isinstance(result, bool):
+        return result
+    text = _text(result)
+    if text is None:
+        return None
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"invalid boolean {result!r}")
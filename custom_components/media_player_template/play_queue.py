@@ -0,0 +1,106 @@
+"""Local play queue of the template media player."""
+from collections import deque
+
+from homeassistant.components.media_player import MediaPlayerEnqueue
+from homeassistant.exceptions import HomeAssistantError
+
+# Largest queue, every item is written into the state attributes.
+MAX_QUEUE_SIZE = 200
+
+
+class PlayQueue:
+    """Queue of ``(media_type, media_id)`` items with a current position.
+
+    Items before the position were played, previous track goes back to
+    them. The queue holds at most ``max_size`` items and makes room by
+    dropping the oldest played items, which like appending is O(1).
+    """
+
+    __slots__ = ("max_size", "position", "version", "_items", "_attributes")
+
+    def __init__(self, max_size):
+        """Initialize an empty queue."""
+        self.max_size = max_size
+        # Index of the current item, None while the queue is empty.
+        self.position = None
+        self.version = 0
+        self._items = deque()
+        self._attributes = None
+
+    def __len__(self):
+        """Return the number of items, played ones included."""
+        return len(self._items)
+
+    def enqueue(self, item, enqueue=None):
+        """Add item as enqueue says, return it if it is to be played now.
+
+        Without enqueue, or with replace, the queue is cleared first. An item
+        added to an empty queue is always played.
+        """
+        if not self._items or enqueue in (None, MediaPlayerEnqueue.REPLACE):
+            self._items.clear()
+            self._items.append(item)
+            self.position = 0
+            self._changed()
+            return item
+        self._make_room()
+        if enqueue == MediaPlayerEnqueue.ADD:
+            self._items.append(item)
+            self._changed()
+            return None
+        self._items.insert(self.position + 1, item)
+        if enqueue == MediaPlayerEnqueue.NEXT:
+            self._changed()
+            return None
+        self.position += 1
+        self._changed()
+        return item
+
+    def next(self):
+        """Move to the next item and return it, None at the end."""
+        if self.position is None or self.position + 1 >= len(self._items):
+            return None
+        self.position += 1
+        self._changed()
+        return self._items[self.position]
+
+    def previous(self):
+        """Move to the previous item and return it, None at the start."""
+        if not self.position:
+            return None
+        self.position -= 1
+        self._changed()
+        return self._items[self.position]
+
+    def clear(self):
+        """Remove all items."""
+        self._items.clear()
+        self.position = None
+        self._changed()
+
+    def as_attributes(self):
+        """Return the queue as state attributes."""
+        if self._attributes is None:
+            self._attributes = {
+                "queue": [
+                    {"media_content_type": media_type, "media_content_id": media_id}
+                    for media_type, media_id in self._items
+                ],
+                "queue_position": self.position,
+            }
+        return self._attributes
+
+    def _make_room(self):
+        """Drop the oldest played item if the queue is full."""
+        if len(self._items) < self.max_size:
+            return
+        if not self.position:
+            raise HomeAssistantError(
+                f"Play queue is full ({self.max_size} items still to play)"
+            )
+        self._items.popleft()
+        self.position -= 1
+
+    def _changed(self):
+        self.version += 1
+        self._attributes = None
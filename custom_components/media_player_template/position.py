@@ -0,0 +1,65 @@
+"""Media position model for the template media player."""
+from datetime import datetime
+
+# Seconds a rendered position may drift from the extrapolated one while playing
+# before it is treated as a real change (seek, skip, buffering).
+POSITION_TOLERANCE = 1.5
+
+
+class MediaPosition:
+    """Position of the current media as (position, updated_at, playback rate).
+
+    The frontend extrapolates ``media_position`` from ``media_position_updated_at``
+    while the player is playing, so the timestamp is only moved when a rendered
+    position no longer matches the extrapolated one.
+    """
+
+    __slots__ = ("position", "updated_at", "rate", "duration")
+
+    def __init__(self):
+        """Initialize an empty position."""
+        self.position = None
+        self.updated_at = None
+        self.rate = 0.0
+        # Extrapolated positions stop at the duration, if known.
+        self.duration = None
+
+    def extrapolate(self, now: datetime):
+        """Return the expected position at ``now``."""
+        if self.position is None or not self.rate or self.updated_at is None:
+            return self.position
+        position = self.position + self.rate * (now - self.updated_at).total_seconds()
+        if self.duration is not None:
+            position = min(position, self.duration)
+        return position
+
+    def set_position(self, position, now: datetime) -> bool:
+        """Store a rendered position, return True if the model changed."""
+        if position is None:
+            if self.position is None:
+                return False
+            self.position = None
+            self.updated_at = None
+            return True
+
+        expected = self.extrapolate(now)
+        if expected is not None:
+            if self.rate:
+                if abs(position - expected) <= POSITION_TOLERANCE:
+                    return False
+            elif position == expected:
+                return False
+
+        self.position = position
+        self.updated_at = now
+        return True
+
+    def set_rate(self, rate: float, now: datetime) -> bool:
+        """Change the playback rate, re-anchoring the position at ``now``."""
+        if rate == self.rate:
+            return False
+        if self.position is not None and self.updated_at is not None:
+            self.position = self.extrapolate(now)
+            self.updated_at = now
+        self.rate = rate
+        return True
@@ -0,0 +1,118 @@
+"""On-demand profiling of the template media player code paths."""
+from collections import Counter
+import cProfile
+from functools import wraps
+import time
+import types
+
+
+class PlatformProfiler:
+    """cProfile that only runs inside the sections of this platform.
+
+    Sections are the methods decorated with ``profiled`` or ``async_profiled``.
+    The profiler is switched on when the outermost section is entered and off
+    when it is left, so time spent elsewhere in the event loop is not
+    recorded. Wall time per entity is kept alongside to attribute stalls to
+    players.
+    """
+
+    def __init__(self):
+        """Initialize an idle profiler."""
+        self.profile = None
+        self.entity_ids = None
+        self.entity_times = Counter()
+        self._depth = 0
+        self._start = None
+
+    def start(self, entity_ids=None):
+        """Start profiling, optionally only sections of entity_ids."""
+        self.profile = cProfile.Profile()
+        self.entity_ids = set(entity_ids) if entity_ids else None
+        self.entity_times = Counter()
+
+    def stop(self):
+        """Stop profiling and return the profile and wall time per entity."""
+        profile, entity_times = self.profile, self.entity_times
+        if self._depth:
+            profile.disable()
+        self.profile = None
+        self.entity_ids = None
+        self.entity_times = Counter()
+        self._depth = 0
+        return profile, entity_times
+
+    def wants(self, entity_id):
+        """Return True if sections of entity_id are being profiled."""
+        return self.profile is not None and (
+            self.entity_ids is None or entity_id in self.entity_ids
+        )
+
+    def enter(self):
+        """Enter a section."""
+        self._depth += 1
+        if self._depth == 1:
+            self._start = time.perf_counter()
+            self.profile.enable()
+
+    def leave(self, entity_id):
+        """Leave a section."""
+        self._depth -= 1
+        if self._depth == 0:
+            self.profile.disable()
+            self.entity_times[entity_id] += time.perf_counter() - self._start
+
+
+def profiled(func):
+    """Profile a callback of an object with _profiler and entity_id."""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = self._profiler
+        if profiler is None or not profiler.wants(self.entity_id):
+            return func(self, *args, **kwargs)
+        profiler.enter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            if profiler.profile is not None:
+                profiler.leave(self.entity_id)
+
+    return wrapper
+
+
+def async_profiled(func):
+    """Profile the steps of a coroutine method, but not the time it awaits."""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        coro = func(self, *args, **kwargs)
+        profiler = self._profiler
+        if profiler is None or not profiler.wants(self.entity_id):
+            return coro
+        return _profiled_steps(profiler, self.entity_id, coro)
+
+    return wrapper
+
+
+@types.coroutine
+def _profiled_steps(profiler, entity_id, coro):
+    """Drive coro, profiling each step until profiling stops."""
+    value, error = None, None
+    while True:
+        active = profiler.profile is not None
+        if active:
+            profiler.enter()
+        try:
+            if error is not None:
+                future = coro.throw(error)
+            else:
+                future = coro.send(value)
+        except StopIteration as ex:
+            return ex.value
+        finally:
+            if active and profiler.profile is not None:
+                profiler.leave(entity_id)
+        try:
+            value, error = (yield future), None
+        except BaseException as ex:  # pylint: disable=broad-except
+            value, error = None, ex
@@ -0,0 +1,161 @@
+"""Services of the template media player."""
+from datetime import timedelta
+import logging
+import time
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.service import async_register_admin_service
+
+from .catalog import SEARCH_LIMIT
+from .index import async_get_index
+from .profiler import PlatformProfiler
+
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # Home Assistant before 2023.7
+    SupportsResponse = None
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAIN = "media_player_template"
+DATA_ENTITIES = f"{DOMAIN}_entities"
+DATA_PROFILER = f"{DOMAIN}_profiler"
+SERVICE_DUMP_STATS = "dump_stats"
+SERVICE_DUMP_DEPENDENCIES = "dump_dependencies"
+SERVICE_PROFILE = "profile"
+SERVICE_SEARCH_MEDIA = "search_media"
+CONF_DURATION = "duration"
+CONF_QUERY = "query"
+CONF_LIMIT = "limit"
+
+DUMP_STATS_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTITY_ID): cv.entity_ids})
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_DURATION, default=timedelta(seconds=60)): vol.All(
+            cv.positive_time_period, vol.Range(max=timedelta(hours=1))
+        ),
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    }
+)
+SEARCH_MEDIA_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(CONF_QUERY): cv.string,
+        vol.Optional(CONF_LIMIT, default=SEARCH_LIMIT): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=500)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass):
+    """Register the services of the platform once."""
+    if hass.services.has_service(DOMAIN, SERVICE_DUMP_STATS):
+        return
+    profiler = hass.data[DATA_PROFILER] = PlatformProfiler()
+
+    async def async_dump_stats(call):
+        """Log and return the statistics of the template media players."""
+        entity_ids = call.data.get(ATTR_ENTITY_ID)
+        stats = {
+            entity.entity_id: entity.stats()
+            for entity in hass.data.get(DATA_ENTITIES, ())
+            if not entity_ids or entity.entity_id in entity_ids
+        }
+        for entity_id, entity_stats in sorted(stats.items()):
+            _LOGGER.info("Statistics of %s: %s", entity_id, entity_stats)
+        return stats
+
+    async def async_dump_dependencies(call):
+        """Log and return the templates depending on each upstream entity."""
+        index = async_get_index(hass)
+        fan_out = index.fan_out()
+        entity_ids = call.data.get(ATTR_ENTITY_ID) or fan_out
+        dependencies = {
+            entity_id: {
+                "fan_out": fan_out.get(entity_id, 0),
+                "templates": [
+                    f"{player} {key}" for player, key in index.dependants(entity_id)
+                ],
+            }
+            for entity_id in sorted(
+                entity_ids, key=lambda entity_id: -fan_out.get(entity_id, 0)
+            )
+        }
+        for entity_id, dependants in dependencies.items():
+            _LOGGER.info("Dependants of %s: %s", entity_id, dependants)
+        return dependencies
+
+    async def async_profile(call):
+        """Profile the platform for a while and write the result to a file."""
+        if profiler.profile is not None:
+            raise HomeAssistantError("A template media player profile is running")
+        path = hass.config.path(f"{DOMAIN}.{int(time.time())}.prof")
+        duration = call.data[CONF_DURATION]
+        profiler.start(call.data.get(ATTR_ENTITY_ID))
+        _LOGGER.warning(
+            "Profiling template media players for %s, writing to %s", duration, path
+        )
+
+        async def async_finish(_now):
+            profile, entity_times = profiler.stop()
+            await hass.async_add_executor_job(profile.dump_stats, path)
+            _LOGGER.warning(
+                "Wrote template media player profile to %s, slowest players: %s",
+                path,
+                ", ".join(
+                    f"{entity_id} {seconds * 1000:.1f} ms"
+                    for entity_id, seconds in entity_times.most_common(10)
+                ),
+            )
+
+        async_call_later(hass, duration, async_finish)
+
+    async def async_search_media(call):
+        """Return the media library entries of players matching a query."""
+        entity_ids = call.data[ATTR_ENTITY_ID]
+        return {
+            entity.entity_id: [
+                item.as_dict(parent=False)
+                for item in await entity.async_search_catalog(
+                    call.data[CONF_QUERY], call.data[CONF_LIMIT]
+                )
+            ]
+            for entity in hass.data.get(DATA_ENTITIES, ())
+            if entity.entity_id in entity_ids and entity.has_media_library
+        }
+
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_PROFILE, async_profile, PROFILE_SCHEMA
+    )
+
+    _async_register_with_response(
+        hass, SERVICE_DUMP_STATS, async_dump_stats, DUMP_STATS_SCHEMA
+    )
+    _async_register_with_response(
+        hass, SERVICE_DUMP_DEPENDENCIES, async_dump_dependencies, DUMP_STATS_SCHEMA
+    )
+    _async_register_with_response(
+        hass, SERVICE_SEARCH_MEDIA, async_search_media, SEARCH_MEDIA_SCHEMA
+    )
+
+
+@callback
+def _async_register_with_response(hass, service, service_func, schema):
+    """Register a service that returns response data where supported."""
+    if SupportsResponse is None:
+        hass.services.async_register(DOMAIN, service, service_func, schema)
+    else:
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            service_func,
+            schema,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
@@ -0,0 +1,83 @@
+"""Interning and result sharing of identical templates across players."""
+import re
+from weakref import WeakValueDictionary
+
+from homeassistant.core import callback
+
+DATA_SHARED_TEMPLATES = "media_player_template_shared_templates"
+
+# Templates mentioning ``this`` render differently per player.
+_THIS_RE = re.compile(r"\bthis\b")
+
+
+@callback
+def async_get_shared_templates(hass):
+    """Return the shared templates of the platform, creating them on first use."""
+    shared = hass.data.get(DATA_SHARED_TEMPLATES)
+    if shared is None:
+        shared = hass.data[DATA_SHARED_TEMPLATES] = SharedTemplates(hass)
+    return shared
+
+
+class SharedTemplate:
+    """A template used by several players, with its last render.
+
+    The render is reused while every entity it read still has the same state
+    object. Renders that read whole domains or the current time are not
+    reused.
+    """
+
+    __slots__ = ("__weakref__", "template", "info", "_states")
+
+    def __init__(self, template):
+        """Initialize the shared template."""
+        self.template = template
+        self.info = None
+        self._states = None
+
+    @callback
+    def async_current_info(self, hass):
+        """Return the last render if its dependencies did not change."""
+        states = self._states
+        if states is None:
+            return None
+        get = hass.states.get
+        for entity_id, state in states:
+            if get(entity_id) is not state:
+                return None
+        return self.info
+
+    @callback
+    def async_store(self, hass, info):
+        """Store a render for the other players to reuse."""
+        self.info = info
+        if (
+            info.has_time
+            or info.all_states
+            or info.all_states_lifecycle
+            or info.domains
+            or info.domains_lifecycle
+        ):
+            self._states = None
+            return
+        get = hass.states.get
+        self._states = tuple((entity_id, get(entity_id)) for entity_id in info.entities)
+
+
+class SharedTemplates:
+    """Intern identical templates that do not depend on the player."""
+
+    def __init__(self, hass):
+        """Initialize the interned templates."""
+        self._hass = hass
+        self._templates = WeakValueDictionary()
+
+    @callback
+    def async_intern(self, template):
+        """Return the shared template for template, None if it is per player."""
+        if template.is_static or _THIS_RE.search(template.template):
+            return None
+        shared = self._templates.get(template.template)
+        if shared is None:
+            shared = self._templates[template.template] = SharedTemplate(template)
+        return shared
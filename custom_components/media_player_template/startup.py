@@ -0,0 +1,74 @@
+"""Batched start of template tracking once Home Assistant has started."""
+from collections import OrderedDict
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.start import async_at_start
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_STARTUP = "media_player_template_startup"
+
+# Players whose templates are first rendered per event loop iteration.
+STARTUP_BATCH_SIZE = 50
+
+
+@callback
+def async_get_startup_queue(hass):
+    """Return the startup queue of the platform, creating it on first use."""
+    queue = hass.data.get(DATA_STARTUP)
+    if queue is None:
+        queue = hass.data[DATA_STARTUP] = StartupQueue(hass)
+    return queue
+
+
+class StartupQueue:
+    """Start players in batches once Home Assistant has started.
+
+    Players added during startup show their restored state until their turn
+    comes. The event loop is free for other work between batches, so the first
+    renders of a large fleet do not stall it. Players added once Home
+    Assistant is starting or running start right away, unless earlier
+    players are still waiting.
+    """
+
+    def __init__(self, hass):
+        """Initialize an empty queue."""
+        self._hass = hass
+        self._pending = OrderedDict()
+        self._unsub = None
+
+    @callback
+    def async_add(self, key, start):
+        """Call start for key now if Home Assistant has started, else queue it."""
+        if self._hass.is_running and not self._pending:
+            start()
+            return
+        self._pending[key] = start
+        if len(self._pending) > 1:
+            # A drain is already scheduled.
+            return
+        # Drains right away if the start event has already been fired.
+        self._unsub = async_at_start(self._hass, self._async_drain)
+
+    @callback
+    def async_remove(self, key):
+        """Drop key if it has not been started yet."""
+        self._pending.pop(key, None)
+        if not self._pending and self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_drain(self, _hass=None):
+        """Start the next batch and schedule the one after it."""
+        self._unsub = None
+        for _ in range(min(STARTUP_BATCH_SIZE, len(self._pending))):
+            key, start = self._pending.popitem(last=False)
+            # A failing player must not keep the rest from starting.
+            try:
+                start()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error starting %s", key)
+        if self._pending:
+            self._hass.loop.call_soon(self._async_drain)
@@ -0,0 +1,84 @@
+"""Runtime statistics for the template media player."""
+from collections import deque
+
+# Number of recent samples percentiles are computed over.
+DURATION_SAMPLES = 256
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class DurationStats:
+    """Count and total of a duration, with percentiles over recent samples."""
+
+    __slots__ = ("count", "total", "maximum", "_samples")
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._samples = deque(maxlen=DURATION_SAMPLES)
+
+    def record(self, seconds):
+        """Add a duration in seconds."""
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self._samples.append(seconds)
+
+    def as_dict(self):
+        """Return the statistics in milliseconds."""
+        if not self.count:
+            return {"count": 0}
+        samples = sorted(self._samples)
+
+        def percentile(pct):
+            return _ms(samples[min(len(samples) - 1, int(len(samples) * pct / 100))])
+
+        return {
+            "count": self.count,
+            "total_ms": _ms(self.total),
+            "mean_ms": _ms(self.total / self.count),
+            "p50_ms": percentile(50),
+            "p90_ms": percentile(90),
+            "p99_ms": percentile(99),
+            "max_ms": _ms(self.maximum),
+        }
+
+
+class ActionStats:
+    """Calls, concurrency outcomes and run time of an action script."""
+
+    __slots__ = (
+        "script",
+        "calls",
+        "cancelled",
+        "dropped",
+        "queued",
+        "max_queue_depth",
+        "run_time",
+    )
+
+    def __init__(self, script):
+        """Initialize the statistics of script."""
+        self.script = script
+        self.calls = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.queued = 0
+        self.max_queue_depth = 0
+        self.run_time = DurationStats()
+
+    def as_dict(self):
+        """Return the statistics as a dict."""
+        return {
+            "calls": self.calls,
+            "cancelled": self.cancelled,
+            "dropped": self.dropped,
+            "queued": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": max(0, self.script.runs - 1),
+            "run_time": self.run_time.as_dict(),
+        }
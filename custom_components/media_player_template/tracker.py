@@ -0,0 +1,466 @@
+"""Template tracking for the template media player."""
+from functools import partial
+import logging
+import time
+
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_STATE_CHANGED
+from homeassistant.core import callback
+from homeassistant.exceptions import TemplateError
+from homeassistant.helpers.event import (
+    async_track_time_interval,
+    async_track_utc_time_change,
+)
+
+from .index import async_get_index
+from .profiler import profiled
+from .shared import async_get_shared_templates
+from .stats import DurationStats
+
+_LOGGER = logging.getLogger(__name__)
+
+_UNSET = object()
+
+# Re-renders of a failing template are held back for this many seconds after
+# the first error, doubling per consecutive error up to the maximum.
+ERROR_BACKOFF_BASE = 1.0
+ERROR_BACKOFF_MAX = 60.0
+# A repeated error is logged at most once per interval, with its count.
+ERROR_LOG_INTERVAL = 300.0
+
+
+class _TrackedTemplate:
+    """A template tracked by a TemplateTracker."""
+
+    __slots__ = (
+        "key",
+        "template",
+        "shared",
+        "variables",
+        "rate_limit",
+        "update_interval",
+        "enabled",
+        "result",
+        "info",
+        "last_render",
+        "timer",
+        "render_time",
+        "errors",
+        "failures",
+        "retry_at",
+        "error_message",
+        "error_logged_at",
+        "errors_suppressed",
+        "reused",
+        "unsub_interval",
+    )
+
+    def __init__(
+        self, key, template, shared, variables, rate_limit, update_interval, enabled
+    ):
+        """Initialize the tracked template."""
+        self.key = key
+        self.template = template
+        self.shared = shared
+        self.variables = variables
+        self.rate_limit = rate_limit.total_seconds() if rate_limit else None
+        self.update_interval = update_interval
+        self.enabled = enabled
+        self.result = _UNSET
+        self.info = None
+        self.last_render = None
+        self.timer = None
+        self.render_time = DurationStats()
+        self.errors = 0
+        self.failures = 0
+        self.retry_at = None
+        self.error_message = None
+        self.error_logged_at = None
+        self.errors_suppressed = 0
+        self.reused = 0
+        self.unsub_interval = None
+
+    @property
+    def entities(self):
+        """Return the entity ids the last render depended on."""
+        return self.info.entities if self.info is not None else ()
+
+    @property
+    def watches_domains(self):
+        """Return True if the last render depended on whole domains."""
+        info = self.info
+        return info is not None and bool(
+            info.all_states
+            or info.all_states_lifecycle
+            or info.domains
+            or info.domains_lifecycle
+        )
+
+
+class TemplateTracker:
+    """Track templates and deliver their changed results in one callback.
+
+    Templates are re-rendered when an entity they read changes state, which
+    is dispatched by the platform's dependency index. Each
+    template can have a minimum interval between renders, a fixed refresh
+    interval, and can be disabled, which drops its listeners until it is
+    enabled again. ``action`` is called with the triggering event (or None)
+    and a list of ``(key, result)`` tuples, where result may be a
+    TemplateError.
+
+    A template that keeps raising is re-rendered with exponential backoff and
+    its errors are logged once per message and interval, with a count of the
+    ones left out. Both reset once it renders again.
+    """
+
+    def __init__(self, hass, action, profiler=None):
+        """Initialize the tracker."""
+        self._hass = hass
+        self._action = action
+        self._profiler = profiler
+        self._templates = {}
+        self._index = async_get_index(hass)
+        self._shared = async_get_shared_templates(hass)
+        self._started = False
+        self._owner = None
+        self._self_ref_count = 0
+        self._unsub_domains = None
+        self._unsub_time = None
+
+    def add(
+        self,
+        key,
+        template,
+        variables=None,
+        rate_limit=None,
+        update_interval=None,
+        enabled=True,
+    ):
+        """Track template under key, before the tracker is started.
+
+        Templates that do not use ``this`` are interned, identical ones of
+        other players share their compiled form and renders.
+        """
+        shared = self._shared.async_intern(template)
+        if shared is not None:
+            template = shared.template
+        self._templates[key] = _TrackedTemplate(
+            key, template, shared, variables, rate_limit, update_interval, enabled
+        )
+
+    @property
+    def render_counts(self):
+        """Return the number of renders per key."""
+        return {
+            key: tracked.render_time.count for key, tracked in self._templates.items()
+        }
+
+    def stats(self):
+        """Return render count, render time and error count per key."""
+        return {
+            key: {
+                "renders": tracked.render_time.count,
+                "errors": tracked.errors,
+                "consecutive_errors": tracked.failures,
+                "reused": tracked.reused,
+                "render_time": tracked.render_time.as_dict(),
+            }
+            for key, tracked in self._templates.items()
+        }
+
+    @property
+    def entity_id(self):
+        """Return the entity id of the owner of the templates."""
+        return self._owner
+
+    @callback
+    def async_start(self, owner_entity_id=None):
+        """Render all enabled templates and start listening for changes."""
+        self._owner = owner_entity_id
+        self._started = True
+        for tracked in self._templates.values():
+            if tracked.update_interval is not None:
+                tracked.unsub_interval = async_track_time_interval(
+                    self._hass,
+                    partial(self._async_interval_refresh, tracked),
+                    tracked.update_interval,
+                )
+        self.async_refresh()
+
+    @callback
+    def async_stop(self):
+        """Drop all listeners and timers."""
+        self._started = False
+        for tracked in self._templates.values():
+            self._async_cancel_timer(tracked)
+            self._async_unindex(tracked)
+            if tracked.unsub_interval is not None:
+                tracked.unsub_interval()
+                tracked.unsub_interval = None
+        self._async_sync_listeners()
+
+    @callback
+    def async_refresh(self):
+        """Render all enabled templates now, ignoring rate limits."""
+        self._async_refresh(self._templates.values())
+
+    @callback
+    def async_set_enabled(self, keys, enabled):
+        """Enable or disable tracking of keys.
+
+        Disabled templates keep their last result but lose their listeners.
+        Enabled templates are rendered once to catch up.
+        """
+        changed = [
+            self._templates[key]
+            for key in keys
+            if key in self._templates and self._templates[key].enabled != enabled
+        ]
+        if not changed:
+            return
+        for tracked in changed:
+            tracked.enabled = enabled
+            if not enabled:
+                self._async_cancel_timer(tracked)
+                self._async_unindex(tracked)
+        if not self._started:
+            return
+        if enabled:
+            self._async_refresh(changed)
+        else:
+            self._async_sync_listeners()
+
+    @callback
+    @profiled
+    def _async_refresh(self, templates, event=None, force=False):
+        """Render templates and deliver the changed results.
+
+        Unless forced, shared templates reuse a render of another player when
+        their dependencies did not change since.
+        """
+        if not self._started:
+            return
+        self_triggered = (
+            event is not None and event.data.get(ATTR_ENTITY_ID) == self._owner
+        )
+        # Guard against templates that keep changing their own entity.
+        if self_triggered and self._self_ref_count > len(self._templates):
+            _LOGGER.warning(
+                "Template loop detected while processing event: %s, "
+                "skipping template render for %s",
+                event,
+                self._owner,
+            )
+            return
+        now = self._hass.loop.time()
+        updates = [
+            (tracked.key, tracked.result)
+            for tracked in list(templates)
+            if tracked.enabled and self._async_render(tracked, now, force)
+        ]
+        self._async_sync_listeners()
+        if self_triggered:
+            # Only renders that change a result count, one that does not
+            # means the player settled.
+            self._self_ref_count = self._self_ref_count + 1 if updates else 0
+        if updates:
+            self._action(event, updates)
+
+    @callback
+    def _async_render(self, tracked, now, force):
+        """Render a template, return True if its result changed."""
+        self._async_cancel_timer(tracked)
+        tracked.last_render = now
+        self._async_unindex(tracked)
+        shared = tracked.shared
+        info = None
+        if shared is not None and not force:
+            info = shared.async_current_info(self._hass)
+        if info is None:
+            start = time.perf_counter()
+            info = tracked.template.async_render_to_info(tracked.variables)
+            tracked.render_time.record(time.perf_counter() - start)
+            if shared is not None:
+                shared.async_store(self._hass, info)
+        else:
+            tracked.reused += 1
+        tracked.info = info
+        self._async_index(tracked)
+        try:
+            result = info.result()
+        except TemplateError as ex:
+            self._async_failed(tracked, ex, now)
+            result = ex
+            # Every raise is a new exception, the same error is no change.
+            if isinstance(tracked.result, TemplateError) and str(ex) == str(
+                tracked.result
+            ):
+                return False
+        else:
+            if tracked.failures:
+                self._async_recovered(tracked)
+        if result == tracked.result:
+            return False
+        tracked.result = result
+        return True
+
+    @callback
+    def _async_failed(self, tracked, error, now):
+        """Back off re-rendering tracked and log its error, deduplicated."""
+        tracked.errors += 1
+        tracked.failures += 1
+        tracked.retry_at = now + min(
+            ERROR_BACKOFF_MAX, ERROR_BACKOFF_BASE * 2 ** min(tracked.failures - 1, 16)
+        )
+        message = str(error)
+        if (
+            message == tracked.error_message
+            and now - tracked.error_logged_at < ERROR_LOG_INTERVAL
+        ):
+            tracked.errors_suppressed += 1
+            return
+        if tracked.errors_suppressed:
+            _LOGGER.error(
+                "TemplateError('%s') while processing %s in entity '%s' "
+                "(%d more since last logged)",
+                message,
+                tracked.key,
+                self._owner,
+                tracked.errors_suppressed,
+            )
+        else:
+            _LOGGER.error(
+                "TemplateError('%s') while processing %s in entity '%s'",
+                message,
+                tracked.key,
+                self._owner,
+            )
+        tracked.error_message = message
+        tracked.error_logged_at = now
+        tracked.errors_suppressed = 0
+
+    @callback
+    def _async_recovered(self, tracked):
+        """Lift the backoff of tracked once it renders again."""
+        _LOGGER.info(
+            "%s in entity '%s' renders again after %d errors",
+            tracked.key,
+            self._owner,
+            tracked.failures,
+        )
+        tracked.failures = 0
+        tracked.retry_at = None
+        tracked.error_message = None
+        tracked.error_logged_at = None
+        tracked.errors_suppressed = 0
+
+    @callback
+    def _async_index(self, tracked):
+        for entity_id in tracked.entities:
+            self._index.async_add(entity_id, self, tracked)
+
+    @callback
+    def _async_unindex(self, tracked):
+        for entity_id in tracked.entities:
+            self._index.async_remove(entity_id, self, tracked)
+
+    @callback
+    def _async_cancel_timer(self, tracked):
+        if tracked.timer is not None:
+            tracked.timer.cancel()
+            tracked.timer = None
+
+    @callback
+    def _async_sync_listeners(self):
+        """Match the domain and time listeners to the current dependencies."""
+        active = [t for t in self._templates.values() if self._started and t.enabled]
+        watch_domains = any(tracked.watches_domains for tracked in active)
+        if watch_domains and self._unsub_domains is None:
+            self._unsub_domains = self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_any_changed
+            )
+        elif not watch_domains and self._unsub_domains is not None:
+            self._unsub_domains()
+            self._unsub_domains = None
+
+        watch_time = any(t.info is not None and t.info.has_time for t in active)
+        if watch_time and self._unsub_time is None:
+            self._unsub_time = async_track_utc_time_change(
+                self._hass, self._async_time_changed, second=0
+            )
+        elif not watch_time and self._unsub_time is not None:
+            self._unsub_time()
+            self._unsub_time = None
+
+    @callback
+    def async_entity_changed(self, event, templates):
+        """Re-render templates that read the entity of a state change."""
+        if event.data[ATTR_ENTITY_ID] != self._owner:
+            self._self_ref_count = 0
+        self._async_triggered(event, templates)
+
+    @callback
+    def _async_any_changed(self, event):
+        """Re-render templates that read a whole domain or all states."""
+        entity_id = event.data[ATTR_ENTITY_ID]
+        triggered = []
+        for tracked in self._templates.values():
+            if not tracked.enabled or not tracked.watches_domains:
+                continue
+            # Explicitly referenced entities are handled by their own listener.
+            if entity_id in tracked.info.entities:
+                continue
+            info = tracked.info
+            if info.filter(entity_id) or (
+                (
+                    event.data.get("new_state") is None
+                    or event.data.get("old_state") is None
+                )
+                and info.filter_lifecycle(entity_id)
+            ):
+                triggered.append(tracked)
+        if triggered:
+            self._async_triggered(event, triggered, domain_event=True)
+
+    @callback
+    def _async_interval_refresh(self, tracked, now):
+        """Re-render a template on its fixed update interval."""
+        self._async_refresh([tracked], force=True)
+
+    @callback
+    def _async_time_changed(self, now):
+        """Re-render templates that use the current time."""
+        self._async_triggered(
+            None,
+            [
+                tracked
+                for tracked in self._templates.values()
+                if tracked.enabled
+                and tracked.info is not None
+                and tracked.info.has_time
+            ],
+        )
+
+    @callback
+    def _async_triggered(self, event, templates, domain_event=False):
+        """Render triggered templates now, or later when rate limited or
+        backing off after errors."""
+        now = self._hass.loop.time()
+        ready = []
+        for tracked in templates:
+            rate_limit = tracked.rate_limit
+            if rate_limit is None and domain_event and tracked.info.rate_limit:
+                rate_limit = tracked.info.rate_limit.total_seconds()
+            delay = 0
+            if rate_limit and tracked.last_render is not None:
+                delay = tracked.last_render + rate_limit - now
+            if tracked.retry_at is not None:
+                delay = max(delay, tracked.retry_at - now)
+            if delay > 0:
+                if tracked.timer is None:
+                    tracked.timer = self._hass.loop.call_later(
+                        delay, self._async_refresh, [tracked]
+                    )
+                continue
+            ready.append(tracked)
+        if ready:
+            self._async_refresh(ready, event)